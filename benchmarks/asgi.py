@@ -0,0 +1,239 @@
+"""
+Serving-mode benchmark: `gunicorn wsgi` (sync workers) against
+`uvicorn asgi:application` at the same memory budget. The worker count of
+each server is whatever fits the budget, measured from the resident size of
+one warmed-up worker, then both are loaded with a growing number of
+concurrent clients mixing favorites reads with the catalog lists.
+
+    $ pipenv run python benchmarks/asgi.py --memory-mb 512 --concurrency 8,32,128
+    $ pipenv run python benchmarks/asgi.py --postgres --output asgi-pg.json
+
+Needs gunicorn, uvicorn, asgiref and the async driver of the database.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from routes import SRC, free_port, git_commit, percentile, seed, spawn_postgres
+
+ROOT = os.path.join(SRC, "..")
+
+SERVERS = {
+    "gunicorn_wsgi": lambda port, workers: [
+        "gunicorn", "wsgi", "--chdir", SRC, "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers), "--log-level", "warning"],
+    "uvicorn_asgi": lambda port, workers: [
+        "uvicorn", "asgi:application", "--app-dir", SRC, "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+}
+
+
+def paths(users):
+    # what a browsing client does: mostly favorites, some list pages
+    return [f"/user/favorites/{user}?expand=entity" for user in range(1, users + 1)] + \
+        ["/characters?limit=50", "/planets?limit=50"] * (users // 4 or 1)
+
+
+# <-- Processes -->
+
+
+def process_tree(pid):
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as stat:
+                    parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending += children.get(current, [])
+    return tree
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss_mb(pid):
+    return sum(rss_mb(current) for current in process_tree(pid))
+
+
+def start(server, workers, env):
+    port = free_port()
+    process = subprocess.Popen(SERVERS[server](port, workers), cwd=ROOT, env=env,
+                               start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/characters?limit=1")
+            connection.getresponse().read()
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    stop(process)
+    sys.exit(f"{server} did not come up on port {port}")
+
+
+def stop(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+# <-- Load -->
+
+
+def load(port, urls, concurrency, duration):
+    timings, errors, lock = [], [0], threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        n = offset
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request("GET", urls[n % len(urls)])
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    timings.append(elapsed)
+                else:
+                    errors[0] += 1
+            n += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(timings),
+        "errors": errors[0],
+        "requests_per_sec": round(len(timings) / elapsed, 1),
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 3) if timings else None,
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 3) if timings else None,
+    }
+
+
+def bench(server, args, env, urls):
+    # size one worker first, then fill the budget with as many as fit
+    process, port = start(server, 1, env)
+    try:
+        load(port, urls, 4, 1)
+        tree = process_tree(process.pid)
+        # a lone uvicorn worker has no supervising process above it
+        master = rss_mb(process.pid) if len(tree) > 1 else 0
+        worker = tree_rss_mb(process.pid) - master
+    finally:
+        stop(process)
+    workers = max(1, int((args.memory_mb - master) // worker))
+
+    process, port = start(server, workers, env)
+    try:
+        runs = []
+        for concurrency in [int(n) for n in args.concurrency.split(",")]:
+            result = load(port, urls, concurrency, args.duration)
+            result["rss_mb"] = round(tree_rss_mb(process.pid), 1)
+            runs.append(result)
+            print(f"{server:14} workers={workers:<3} c={concurrency:<4} "
+                  f"{result['requests_per_sec']:>8} req/s  p99 {result['p99_ms']} ms  "
+                  f"rss {result['rss_mb']} MB  errors {result['errors']}")
+    finally:
+        stop(process)
+    return {"workers": workers, "worker_rss_mb": round(worker, 1), "runs": runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--favorites", type=int, default=10)
+    parser.add_argument("--memory-mb", type=float, default=512,
+                        help="resident memory budget of the whole server")
+    parser.add_argument("--concurrency", default="8,32,128")
+    parser.add_argument("--duration", type=float, default=10,
+                        help="seconds per concurrency level")
+    parser.add_argument("--servers", default=",".join(SERVERS))
+    parser.add_argument("--postgres", action="store_true",
+                        help="spawn a local Postgres")
+    parser.add_argument("--database-url")
+    parser.add_argument("--output", default="asgi-benchmark-results.json")
+    args = parser.parse_args()
+
+    stop_database = None
+    if args.postgres:
+        database_url, stop_database = spawn_postgres()
+    elif args.database_url:
+        database_url = args.database_url
+    else:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    env = dict(os.environ, DATABASE_URL=database_url, CACHE_BACKEND="memory")
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, SRC)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "memory_mb": args.memory_mb,
+        "duration": args.duration,
+        "results": {}
+    }
+    try:
+        import models
+        from app import create_app
+        app = create_app()
+        with app.app_context():
+            report["database"] = models.db.engine.dialect.name
+            seed(models.db, models, args.size, args.users, args.favorites)
+            models.db.session.remove()
+
+        urls = paths(args.users)
+        for server in args.servers.split(","):
+            report["results"][server] = bench(server, args, env, urls)
+    finally:
+        if stop_database is not None:
+            stop_database()
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
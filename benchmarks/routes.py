@@ -0,0 +1,401 @@
+"""
+Route benchmark: seeds a synthetic catalog and drives every route in
+src/app.py through the Flask test client and a real WSGI server, reporting
+p50/p95/p99 latency, requests/sec and queries per request as JSON.
+
+    $ pipenv run python benchmarks/routes.py --size 5000 --requests 200
+    $ pipenv run python benchmarks/routes.py --postgres --output pg.json
+    $ pipenv run python benchmarks/routes.py --compare before.json
+
+SQLite (a temporary file) is used by default. --postgres spawns a throwaway
+local server with initdb/pg_ctl, --database-url points at any other database.
+Requests are sent one at a time so the query counter is exact per request.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+CHARACTER_DETAILS = {"height": "172", "mass": 77, "hair_color": "blond", "skin_color": "fair",
+                     "eye_color": "blue", "birth_year": "19BBY", "gender": "male"}
+PLANET_DETAILS = {"population": "200000", "gravity": 1.0, "rotation_period": 23, "orbital_period": 304,
+                  "climate": "arid", "terrain": "desert", "surface_water": "1"}
+VEHICLE_DETAILS = {"model": "T-65", "vehicle_class": "starfighter", "manufacturer": "Incom",
+                   "cost_in_credits": 149999, "length": 12.5, "crew": 1, "passengers": 0,
+                   "max_atmosphering_speed": 1050, "cargo_capacity": 110, "consumables": "1 week"}
+
+
+# <-- Database -->
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_postgres():
+    if shutil.which("initdb") is None or shutil.which("pg_ctl") is None:
+        sys.exit("--postgres needs initdb and pg_ctl on the PATH")
+    data = tempfile.mkdtemp(prefix="bench-pg-")
+    port = free_port()
+    subprocess.run(["initdb", "-D", data, "-U", "bench", "--auth=trust"],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run(["pg_ctl", "-D", data, "-w", "-l", os.path.join(data, "server.log"),
+                    "-o", f"-p {port} -k {data} -c listen_addresses=''", "start"],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run(["createdb", "-h", data, "-p", str(port), "-U", "bench", "bench"],
+                   check=True)
+
+    def stop():
+        subprocess.run(["pg_ctl", "-D", data, "-m", "immediate", "stop"],
+                       stdout=subprocess.DEVNULL)
+        shutil.rmtree(data, ignore_errors=True)
+    return f"postgresql://bench@/bench?host={data}&port={port}", stop
+
+
+def seed(db, models, size, users, favorites):
+    import search
+    db.drop_all()
+    db.create_all()
+    insert = db.session.execute
+    insert(models.User.__table__.insert(), [
+        {"username": f"user{i}", "email": f"user{i}@bench.io", "password": "secret"}
+        for i in range(1, users + 1)])
+    for model, prefix in ((models.Planets, "p"), (models.Characters, "c"), (models.Vehicles, "v")):
+        insert(model.__table__.insert(), [
+            {"uid": i, "name": f"{prefix}{i}", "url": f"https://swapi.tech/{prefix}/{i}"}
+            for i in range(1, size + 1)])
+    insert(models.Planets_Details.__table__.insert(),
+           [dict(PLANET_DETAILS, uid=i) for i in range(1, size + 1)])
+    insert(models.Characters_Details.__table__.insert(),
+           [dict(CHARACTER_DETAILS, uid=i, planetland=i) for i in range(1, size + 1)])
+    insert(models.Vehicles_Details.__table__.insert(),
+           [dict(VEHICLE_DETAILS, uid=i) for i in range(1, size + 1)])
+    for model, column in ((models.Favorite_Characters, "character_id"),
+                          (models.Favorite_Planets, "planet_id"),
+                          (models.Favorite_Vehicles, "vehicle_id")):
+        insert(model.__table__.insert(), [
+            {"user_id": user, column: (user * favorites + n) % size + 1}
+            for user in range(1, users + 1) for n in range(favorites)])
+    # the Core inserts above bypass the session hooks that maintain it
+    search.rebuild(db.session.connection())
+    db.session.commit()
+
+
+# <-- Scenarios -->
+# One entry per endpoint, in run order: writes create the rows that the later
+# deletes remove, so every request hits an existing row. Each builder gets the
+# request number and returns (method, path, json body).
+
+
+def scenarios(size, users):
+    fresh = size * 10
+
+    def bulk(prefix, i, extra=None):
+        base = fresh * 2 + i * 20
+        return [dict(extra or {}, uid=base + n, name=f"{prefix}b{base + n}",
+                     url=f"https://swapi.tech/{prefix}/bulk/{base + n}") for n in range(20)]
+
+    def sync(prefix, i):
+        # a nightly re-sync of 20 seeded rows where only the first one changed
+        rows = [{"uid": uid, "name": f"{prefix}{uid}", "url": f"https://swapi.tech/{prefix}/{uid}"}
+                for uid in ((i * 20 + n) % size + 1 for n in range(20))]
+        rows[0]["url"] += f"/sync{i}"
+        return rows
+
+    def sync_details(details, i):
+        return [dict(details, uid=(i * 20 + n) % size + 1) for n in range(20)]
+
+    def bulk_details(details, i):
+        # details of the rows created by the entity bulk scenario
+        return [dict(details, uid=fresh * 2 + i * 20 + n) for n in range(20)]
+
+    return [
+        ("sitemap", lambda i: ("GET", "/", None)),
+        ("routes", lambda i: ("GET", "/routes", None)),
+        ("cache_stats", lambda i: ("GET", "/cache/stats", None)),
+        ("metrics", lambda i: ("GET", "/metrics", None)),
+        ("healthz", lambda i: ("GET", "/healthz", None)),
+        ("readyz", lambda i: ("GET", "/readyz", None)),
+        ("get_search", lambda i: ("GET", f"/search?q={('c', 'p', 'v')[i % 3]}{i % size + 1}", None)),
+        ("handle_hello", lambda i: ("GET", "/user", None)),
+        ("post_user", lambda i: ("POST", "/user", {
+            "username": f"new{i}", "email": f"new{i}@bench.io", "password": "secret"})),
+        ("put_user", lambda i: ("PUT", f"/user/{i % users + 1}", {"password": f"pw{i}"})),
+        ("post_character", lambda i: ("POST", "/characters", {
+            "uid": fresh + i, "name": f"nc{i}", "url": f"https://swapi.tech/c/new/{i}"})),
+        ("post_planets", lambda i: ("POST", "/planets", {
+            "uid": fresh + i, "name": f"np{i}", "url": f"https://swapi.tech/p/new/{i}"})),
+        ("post_vehicles", lambda i: ("POST", "/vehicles", {
+            "uid": fresh + i, "name": f"nv{i}", "url": f"https://swapi.tech/v/new/{i}"})),
+        ("post_characters_bulk", lambda i: ("POST", "/characters/bulk", bulk("c", i))),
+        ("post_planets_bulk", lambda i: ("POST", "/planets/bulk", bulk("p", i))),
+        ("post_vehicles_bulk", lambda i: ("POST", "/vehicles/bulk", bulk("v", i))),
+        ("post_character_details", lambda i: ("POST", "/characters/details",
+                                              dict(CHARACTER_DETAILS, uid=fresh + i, planetland=1))),
+        ("post_planet_details", lambda i: ("POST", "/planets/details",
+                                           dict(PLANET_DETAILS, uid=fresh + i))),
+        ("post_vehicle_details", lambda i: ("POST", "/vehicles/details",
+                                            dict(VEHICLE_DETAILS, uid=fresh + i))),
+        ("post_character_details_bulk", lambda i: ("POST", "/characters/details/bulk",
+                                                   bulk_details(dict(CHARACTER_DETAILS, planetland=1), i))),
+        ("post_planet_details_bulk", lambda i: ("POST", "/planets/details/bulk",
+                                                bulk_details(PLANET_DETAILS, i))),
+        ("post_vehicle_details_bulk", lambda i: ("POST", "/vehicles/details/bulk",
+                                                 bulk_details(VEHICLE_DETAILS, i))),
+        ("put_characters_bulk", lambda i: ("PUT", "/characters/bulk", sync("c", i))),
+        ("put_planets_bulk", lambda i: ("PUT", "/planets/bulk", sync("p", i))),
+        ("put_vehicles_bulk", lambda i: ("PUT", "/vehicles/bulk", sync("v", i))),
+        ("put_character_details_bulk", lambda i: ("PUT", "/characters/details/bulk",
+                                                  sync_details(dict(CHARACTER_DETAILS, planetland=1), i))),
+        ("put_planet_details_bulk", lambda i: ("PUT", "/planets/details/bulk",
+                                               sync_details(PLANET_DETAILS, i))),
+        ("put_vehicle_details_bulk", lambda i: ("PUT", "/vehicles/details/bulk",
+                                                sync_details(VEHICLE_DETAILS, i))),
+        ("get_characters", lambda i: ("GET", "/characters", None)),
+        ("get_planets", lambda i: ("GET", "/planets", None)),
+        ("get_vehicles", lambda i: ("GET", "/vehicles", None)),
+        ("get_characters_details", lambda i: ("GET", f"/characters/details/{i % size + 1}", None)),
+        ("get_planets_details", lambda i: ("GET", f"/planets/details/{i % size + 1}", None)),
+        ("get_vehicles_details", lambda i: ("GET", f"/vehicles/details/{i % size + 1}", None)),
+        ("get_characters_details_list", lambda i: ("GET", "/characters/details?gender=male&mass__gte=70", None)),
+        ("get_planets_details_list", lambda i: ("GET", "/planets/details?climate=arid&terrain=desert", None)),
+        ("get_vehicles_details_list", lambda i: ("GET", "/vehicles/details?vehicle_class=starfighter&crew__lte=2", None)),
+        ("get_character", lambda i: ("GET", f"/characters/{i % size + 1}?expand=details,planet", None)),
+        ("get_planet", lambda i: ("GET", f"/planets/{i % size + 1}?expand=details", None)),
+        ("get_vehicle", lambda i: ("GET", f"/vehicles/{i % size + 1}?expand=details", None)),
+        ("post_characters_details_batch", lambda i: ("POST", "/characters/details/batch", {
+            "uids": [(i + n) % size + 1 for n in range(50)]})),
+        ("post_planets_details_batch", lambda i: ("POST", "/planets/details/batch", {
+            "uids": [(i + n) % size + 1 for n in range(50)]})),
+        ("post_vehicles_details_batch", lambda i: ("POST", "/vehicles/details/batch", {
+            "uids": [(i + n) % size + 1 for n in range(50)]})),
+        ("put_character", lambda i: ("PUT", f"/characters/{i % size + 1}", {
+            "url": f"https://swapi.tech/c/{i % size + 1}/{i}"})),
+        ("put_planet", lambda i: ("PUT", f"/planets/{i % size + 1}", {
+            "url": f"https://swapi.tech/p/{i % size + 1}/{i}"})),
+        ("put_vehicle", lambda i: ("PUT", f"/vehicles/{i % size + 1}", {
+            "url": f"https://swapi.tech/v/{i % size + 1}/{i}"})),
+        ("put_character_details", lambda i: ("PUT", f"/characters/details/{i % size + 1}", {"mass": i + 1})),
+        ("put_planet_details", lambda i: ("PUT", f"/planets/details/{i % size + 1}", {"climate": f"c{i}"})),
+        ("put_vehicle_details", lambda i: ("PUT", f"/vehicles/details/{i % size + 1}", {"crew": i + 1})),
+        ("post_favorite_characters", lambda i: ("POST", f"/favorite/characters/{i % users + 1}",
+                                                {"character_id": i % size + 1})),
+        ("post_favorite_planets", lambda i: ("POST", f"/favorite/planets/{i % users + 1}",
+                                             {"planet_id": i % size + 1})),
+        ("post_favorite_vehicles", lambda i: ("POST", f"/favorite/vehicles/{i % users + 1}",
+                                              {"vehicle_id": i % size + 1})),
+        ("get_favorites", lambda i: ("GET", f"/user/favorites/{i % users + 1}", None)),
+        ("delete_favorite_character", lambda i: ("DELETE", f"/favorite/characters/{i % users + 1}/{i % size + 1}", None)),
+        ("delete_favorite_planet", lambda i: ("DELETE", f"/favorite/planets/{i % users + 1}/{i % size + 1}", None)),
+        ("delete_favorite_vehicle", lambda i: ("DELETE", f"/favorite/vehicles/{i % users + 1}/{i % size + 1}", None)),
+        ("delete_character_details", lambda i: ("DELETE", f"/characters/details/{fresh + i}", None)),
+        ("delete_planet_details", lambda i: ("DELETE", f"/planets/details/{fresh + i}", None)),
+        ("delete_vehicle_details", lambda i: ("DELETE", f"/vehicles/details/{fresh + i}", None)),
+        ("delete_character", lambda i: ("DELETE", f"/characters/{fresh + i}", None)),
+        ("delete_planet", lambda i: ("DELETE", f"/planets/{fresh + i}", None)),
+        ("delete_vehicle", lambda i: ("DELETE", f"/vehicles/{fresh + i}", None)),
+        ("delete_user", lambda i: ("DELETE", f"/user/{users + i + 1}", None)),
+    ]
+
+
+# <-- Clients -->
+
+
+class TestClient:
+    name = "test_client"
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class WSGIClient:
+    name = "wsgi_server"
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args):
+                pass
+        self.server = make_server("127.0.0.1", free_port(), app, threaded=True,
+                                  request_handler=QuietHandler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection(
+            "127.0.0.1", self.server.port)
+
+    def request(self, method, path, body):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                                headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+    def close(self):
+        self.connection.close()
+        self.server.shutdown()
+
+
+# <-- Runner -->
+
+
+def percentile(timings, fraction):
+    return timings[min(len(timings) - 1, int(round(fraction * (len(timings) - 1))))]
+
+
+def run(client, cases, requests, counter):
+    results = {}
+    for endpoint, build in cases:
+        timings, statuses, queries = [], {}, 0
+        started = time.perf_counter()
+        for i in range(requests):
+            method, path, body = build(i)
+            before = counter["queries"]
+            start = time.perf_counter()
+            status = client.request(method, path, body)
+            timings.append(time.perf_counter() - start)
+            queries += counter["queries"] - before
+            statuses[status] = statuses.get(status, 0) + 1
+        elapsed = time.perf_counter() - started
+        timings.sort()
+        results[endpoint] = {
+            "requests": requests,
+            "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+            "requests_per_sec": round(requests / elapsed, 1),
+            "queries_per_request": round(queries / requests, 2)
+        }
+    return results
+
+
+def compare(previous, current):
+    print(f"{'mode/endpoint':60} {'p50 before':>11} {'p50 now':>9} {'change':>8}")
+    for mode, routes in current["results"].items():
+        for endpoint, stats in routes.items():
+            before = previous["results"].get(mode, {}).get(endpoint)
+            if before is None:
+                continue
+            change = (stats["p50_ms"] - before["p50_ms"]) / \
+                before["p50_ms"] * 100 if before["p50_ms"] else 0
+            print(f"{mode + '/' + endpoint:60} {before['p50_ms']:>11.3f} "
+                  f"{stats['p50_ms']:>9.3f} {change:>7.1f}%")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=SRC).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1000,
+                        help="characters, planets and vehicles to seed (each, with details)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--favorites", type=int, default=10,
+                        help="favorites of each kind per user")
+    parser.add_argument("--requests", type=int, default=100,
+                        help="requests per route")
+    parser.add_argument("--clients", default="test_client,wsgi_server")
+    parser.add_argument("--postgres", action="store_true",
+                        help="spawn a local Postgres")
+    parser.add_argument("--database-url")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    stop = None
+    if args.postgres:
+        database_url, stop = spawn_postgres()
+    elif args.database_url:
+        database_url = args.database_url
+    else:
+        database_url = "sqlite:///" + \
+            os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, SRC)
+
+    try:
+        import models
+        from app import create_app
+        from sqlalchemy import event
+
+        app = create_app()
+        cases = scenarios(args.size, args.users)
+        covered = {f"api.{endpoint}" for endpoint, _ in cases}
+        uncovered = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                           if rule.endpoint.startswith("api.")
+                           and rule.endpoint not in covered)
+
+        counter = {"queries": 0}
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "size": args.size,
+            "users": args.users,
+            "favorites": args.favorites,
+            "requests_per_route": args.requests,
+            "uncovered_endpoints": uncovered,
+            "results": {}
+        }
+        with app.app_context():
+            engine = models.db.engine
+            report["database"] = engine.dialect.name
+
+            @event.listens_for(engine, "before_cursor_execute")
+            def count_query(*args):
+                counter["queries"] += 1
+
+            clients = {"test_client": TestClient, "wsgi_server": WSGIClient}
+            for name in args.clients.split(","):
+                seed(models.db, models, args.size, args.users, args.favorites)
+                models.db.session.remove()
+                app.extensions["cache"].clear()
+                client = clients[name](app)
+                try:
+                    report["results"][name] = run(
+                        client, cases, args.requests, counter)
+                finally:
+                    client.close()
+    finally:
+        if stop is not None:
+            stop()
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    print(f"wrote {args.output}")
+    if uncovered:
+        print("endpoints without a scenario: " + ", ".join(uncovered))
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Serialization cost per 10k rows: ORM instances + serialize() + stdlib json
+(the old list handlers) against column rows + the app's JSON provider
+(the current list handlers).
+
+    $ pipenv run python benchmarks/serialization.py --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_FILE
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from app import create_app  # noqa: E402
+from models import db, Characters  # noqa: E402
+
+app = create_app()
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(Characters.__table__.insert(), [
+        {"uid": i, "name": f"character {i}", "url": f"https://swapi.tech/api/people/{i}"}
+        for i in range(1, rows + 1)
+    ])
+    db.session.commit()
+
+
+def orm_serialize(stdlib):
+    db.session.expunge_all()
+    characters = Characters.query.all()
+    return stdlib.dumps({"characters": list(map(lambda character: character.serialize(), characters))}).encode()
+
+
+def row_serialize(provider):
+    columns = list(Characters.__table__.columns)
+    keys = [column.name for column in columns]
+    rows = db.session.execute(select(*columns).order_by(Characters.id)).all()
+    return provider.dumpb({"characters": [dict(zip(keys, row)) for row in rows]})
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        seed(args.rows)
+        stdlib = DefaultJSONProvider(app)
+        assert json.loads(orm_serialize(stdlib)) == json.loads(
+            row_serialize(app.json))
+        before = measure(lambda: orm_serialize(stdlib), args.repeat)
+        after = measure(lambda: row_serialize(app.json), args.repeat)
+
+    scale = 10000 / args.rows
+    print(json.dumps({
+        "rows": args.rows,
+        "provider": type(app.json).__name__,
+        "orm_serialize_stdlib_ms_per_10k": round(before * scale * 1000, 2),
+        "rows_provider_ms_per_10k": round(after * scale * 1000, 2),
+        "speedup": round(before / after, 2)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
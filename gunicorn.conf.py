@@ -0,0 +1,45 @@
+# Picked up automatically by `gunicorn wsgi --chdir ./src/` run from the repo root (see Procfile).
+# Read more about the settings here: https://docs.gunicorn.org/en/stable/settings.html
+import gc
+import os
+
+# build the app once in the master and fork it, so the workers share its
+# pages (copy-on-write) instead of each importing and building their own
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+if preload_app:
+    # no collections while the app is built: freeing objects would leave holes
+    # that later allocations fill, dirtying the pages the workers share. This
+    # file is read again on every HUP, right before the app is preloaded again,
+    # so this runs before each preload; gunicorn has no earlier hook (the first
+    # preload already happened when on_starting runs)
+    gc.disable()
+
+
+def resume_gc():
+    # everything allocated so far moves to a generation the collector never
+    # scans, so collections stop writing to (and copying) the shared pages
+    gc.freeze()
+    gc.enable()
+
+
+def when_ready(server):
+    # after the first preload, right before the first workers are forked
+    resume_gc()
+
+
+def on_reload(server):
+    # after the preload a HUP triggers, before the new workers are forked
+    resume_gc()
+
+
+def post_fork(server, worker):
+    # a worker always collects, whatever state the master is in
+    gc.enable()
+
+    # only set when the app was built before forking (preload_app); sockets
+    # opened by the master must not be shared with the workers
+    application = server.app.callable
+    if application is not None:
+        from pool import dispose_engines
+        dispose_engines(application)
@@ -1,25 +1,117 @@
 import os
+import time
+from flask import request
 from flask_admin import Admin
+from sqlalchemy import String, and_, inspect, or_, text
+from sqlalchemy.orm import joinedload
+from filters import index_columns
 from models import db, User, Characters, Planets, Vehicles, Characters_Details, Planets_Details, Vehicles_Details, Favorite_Characters, Favorite_Planets, Favorite_Vehicles
 from flask_admin.contrib.sqla import ModelView
 
+# column searched by the ajax pickers of relationship fields
+LOOKUP_COLUMNS = {User: "username", Characters: "name",
+                  Planets: "name", Vehicles: "name"}
+# below this pg_class.reltuples is not worth trusting over a real count
+EXACT_COUNT_BELOW = 10000
+
+
+class ApproximateCount:
+    # stands in for the count query, flask-admin only ever calls scalar() on it
+    def __init__(self, view):
+        self.view = view
+
+    def scalar(self):
+        return self.view.approximate_count()
+
+
+class IndexedModelView(ModelView):
+    # list pages that stay cheap on large tables: eager loaded relationships,
+    # cached or estimated counts, sort and search only where an index helps
+    can_set_page_size = True
+    column_auto_select_related = False
+
+    def __init__(self, model, session, page_size, count_ttl, **kwargs):
+        table = model.__table__
+        leading = {columns[0] for columns in index_columns(table)}
+        relationships = inspect(model).relationships
+
+        self.column_sortable_list = [name for name, column in table.columns.items()
+                                     if name in leading and not column.foreign_keys]
+        self.column_searchable_list = [name for name in self.column_sortable_list
+                                       if isinstance(table.columns[name].type, String)]
+        self.list_relationships = [relationship.key for relationship in relationships
+                                   if relationship.direction.name == "MANYTOONE"]
+        # reverse relationships would load every child row into a select box
+        self.form_excluded_columns = [relationship.key for relationship in relationships
+                                      if relationship.direction.name == "ONETOMANY"]
+        self.form_ajax_refs = {
+            relationship.key: {"fields": [LOOKUP_COLUMNS[relationship.mapper.class_]],
+                               "page_size": 10}
+            for relationship in relationships
+            if relationship.key in self.list_relationships
+            and relationship.mapper.class_ in LOOKUP_COLUMNS}
+        self.page_size = page_size
+        self.page_size_options = tuple(sorted({20, 50, 100, page_size}))
+        self.count_ttl = count_ttl
+        self.cached_count = (None, 0)
+        super().__init__(model, session, **kwargs)
+
+    def get_query(self):
+        return super().get_query().options(
+            *[joinedload(getattr(self.model, name)) for name in self.list_relationships])
+
+    def get_count_query(self):
+        # a search or filter narrows the rows, only a real count is right then
+        if request.args.get("search") or any(arg.startswith("flt") for arg in request.args):
+            return super().get_count_query()
+        return ApproximateCount(self)
+
+    def approximate_count(self):
+        count, expires_at = self.cached_count
+        if expires_at > time.monotonic():
+            return count
+
+        count = None
+        if self.session.get_bind().dialect.name == "postgresql":
+            count = self.session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+                {"name": self.model.__tablename__}).scalar()
+            if count is not None and count < EXACT_COUNT_BELOW:
+                count = None
+        if count is None:
+            count = super().get_count_query().scalar()
+        self.cached_count = (count, time.monotonic() + self.count_ttl)
+        return count
+
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        # prefix ranges a b-tree can answer, instead of ILIKE '%term%' on a cast
+        for term in search.split():
+            clause = or_(*[and_(field >= term, field < term + "\U0010ffff")
+                           for field, _ in self._search_fields])
+            query = query.filter(clause)
+            if count_query is not None:
+                count_query = count_query.filter(clause)
+        return query, count_query, joins, count_joins
+
 
 def setup_admin(app):
     app.secret_key = os.environ.get("FLASK_APP_KEY", "sample key")
     app.config["FLASK_ADMIN_SWATCH"] = "cerulean"
     admin = Admin(app, name="4Geeks Admin", template_mode="bootstrap3")
+    options = {"page_size": app.config["ADMIN_PAGE_SIZE"],
+               "count_ttl": app.config["ADMIN_COUNT_TTL"]}
 
     # Add your models here, for example this is how we add a the User model to the admin
-    admin.add_view(ModelView(User, db.session))
-    admin.add_view(ModelView(Characters, db.session))
-    admin.add_view(ModelView(Characters_Details, db.session))
-    admin.add_view(ModelView(Favorite_Characters, db.session))
-    admin.add_view(ModelView(Planets, db.session))
-    admin.add_view(ModelView(Planets_Details, db.session))
-    admin.add_view(ModelView(Favorite_Planets, db.session))
-    admin.add_view(ModelView(Vehicles, db.session))
-    admin.add_view(ModelView(Vehicles_Details, db.session))
-    admin.add_view(ModelView(Favorite_Vehicles, db.session))
+    admin.add_view(IndexedModelView(User, db.session, **options))
+    admin.add_view(IndexedModelView(Characters, db.session, **options))
+    admin.add_view(IndexedModelView(Characters_Details, db.session, **options))
+    admin.add_view(IndexedModelView(Favorite_Characters, db.session, **options))
+    admin.add_view(IndexedModelView(Planets, db.session, **options))
+    admin.add_view(IndexedModelView(Planets_Details, db.session, **options))
+    admin.add_view(IndexedModelView(Favorite_Planets, db.session, **options))
+    admin.add_view(IndexedModelView(Vehicles, db.session, **options))
+    admin.add_view(IndexedModelView(Vehicles_Details, db.session, **options))
+    admin.add_view(IndexedModelView(Favorite_Vehicles, db.session, **options))
 
     # You can duplicate that line to add mew models
-    # admin.add_view(ModelView(YourModelName, db.session))
+    # admin.add_view(IndexedModelView(YourModelName, db.session, **options))
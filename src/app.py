@@ -2,50 +2,179 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, request, jsonify, url_for
-from flask_migrate import Migrate
-from flask_swagger import swagger
+from flask import Blueprint, Flask, Response, request, jsonify, url_for
 from flask_cors import CORS
-from utils import APIException, generate_sitemap
-from admin import setup_admin
-from models import db, User, Characters, Planets, Vehicles, Characters_Details, Planets_Details, Vehicles_Details, Favorite_Characters, Favorite_Planets, Favorite_Vehicles
+from utils import APIException
+from batch import batch_details
+from bulk import bulk_insert, bulk_upsert
+from cache import cached_detail, cached_list, get_cache, init_cache
+from compression import init_compression
+from conditional import conditional
+from expand import expanded_detail
+from favorites import get_user_favorites
+from filters import parse_filters
+from health import init_health, liveness, readiness
+from instrumentation import init_instrumentation, query_budget, render_metrics, unmetered
+from json_provider import init_json
+from listing import streamed_list, wants_stream
+from pool import engine_options, replica_binds
+from search import include_in_migrations, init_search, search
+from sitemap import sitemap_response, wants_json
+from startup import report_enabled, step
+from routing import init_replicas
+from models import db, init_unit_of_work, User, Characters, Planets, Vehicles, Characters_Details, Planets_Details, Vehicles_Details, Favorite_Characters, Favorite_Planets, Favorite_Vehicles
 # from models import Person
 
-app = Flask(__name__)
-app.url_map.strict_slashes = False
+api = Blueprint("api", __name__)
 
-db_url = os.getenv("DATABASE_URL")
-if db_url is not None:
-    app.config["SQLALCHEMY_DATABASE_URI"] = db_url.replace(
-        "postgres://", "postgresql://")
-else:
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:////tmp/test.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-MIGRATE = Migrate(app, db)
-db.init_app(app)
-CORS(app)
-setup_admin(app)
+# <-- Admin and migrations, imported only by the processes that serve them -->
+
+
+def init_migrate(app):
+    from flask_migrate import Migrate
+    Migrate(app, db, include_object=include_in_migrations)
+
+
+def init_admin(app):
+    from admin import setup_admin
+    setup_admin(app)
+
+
+# <-- Application factory -->
+
+
+def create_app(config=None):
+    """Build an app from the environment, with `config` taking precedence.
+
+    Nothing here connects to a database, so the app can be built before a
+    fork (gunicorn's preload_app), and apps with different configurations
+    can live side by side in one process.
+    """
+    app = Flask(__name__)
+    app.url_map.strict_slashes = False
+
+    db_url = os.getenv("DATABASE_URL")
+    if db_url is not None:
+        app.config["SQLALCHEMY_DATABASE_URI"] = db_url.replace(
+            "postgres://", "postgresql://")
+    else:
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:////tmp/test.db"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["DATABASE_REPLICA_URLS"] = [
+        url.strip().replace("postgres://", "postgresql://")
+        for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    app.config["PAGE_SIZE"] = int(os.getenv("PAGE_SIZE", 100))
+    app.config["MAX_PAGE_SIZE"] = int(os.getenv("MAX_PAGE_SIZE", 1000))
+    app.config["STREAM_BATCH_SIZE"] = int(os.getenv("STREAM_BATCH_SIZE", 1000))
+    app.config["BULK_BATCH_SIZE"] = int(os.getenv("BULK_BATCH_SIZE", 500))
+    app.config["MAX_BATCH_UIDS"] = int(os.getenv("MAX_BATCH_UIDS", 5000))
+    app.config["CACHE_BACKEND"] = os.getenv("CACHE_BACKEND", "memory")
+    app.config["CACHE_URL"] = os.getenv("CACHE_URL")
+    app.config["CACHE_MAX_ENTRIES"] = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+    app.config["CACHE_TTL"] = float(os.getenv("CACHE_TTL", 300))
+    app.config["JSON_PROVIDER"] = os.getenv("JSON_PROVIDER", "orjson")
+    app.config["SLOW_QUERY_MS"] = float(os.getenv("SLOW_QUERY_MS", 100))
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+    app.config["COMPRESS_LEVEL"] = int(os.getenv("COMPRESS_LEVEL", 6))
+    app.config["COMPRESS_BROTLI_QUALITY"] = int(
+        os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+    app.config["ADMIN_PAGE_SIZE"] = int(os.getenv("ADMIN_PAGE_SIZE", 50))
+    app.config["ADMIN_COUNT_TTL"] = float(os.getenv("ADMIN_COUNT_TTL", 60))
+    app.config["ASGI_THREADS"] = int(os.getenv("ASGI_THREADS", 16))
+    app.config["READY_CHECK_TTL"] = float(os.getenv("READY_CHECK_TTL", 2))
+    app.config["APP_MODE"] = os.getenv("APP_MODE", "all")
+    app.config["STARTUP_REPORT"] = report_enabled()
+    app.config.update(config or {})
+
+    # derived from the urls, unless given outright
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(
+        app.config["SQLALCHEMY_DATABASE_URI"]))
+    app.config.setdefault("SQLALCHEMY_BINDS", replica_binds(
+        app.config["DATABASE_REPLICA_URLS"]))
+    if app.config["APP_MODE"] not in ("all", "api"):
+        raise ValueError(f"APP_MODE must be all or api, not {app.config['APP_MODE']}")
+
+    init_steps = [
+        init_json,
+        db.init_app,
+        init_replicas,
+        # registered first so its after_request hook runs last and sees the commit
+        init_instrumentation,
+        init_unit_of_work,
+        init_cache,
+        init_compression,
+        init_search,
+        init_health,
+        CORS,
+    ]
+    if app.config["APP_MODE"] == "all":
+        init_steps += [init_migrate, init_admin]
+    for init in init_steps:
+        with step(app, init):
+            init(app)
+
+    app.register_blueprint(api)
+    return app
 
 # Handle/serialize errors like a JSON object
 
 
-@app.errorhandler(APIException)
+@api.app_errorhandler(APIException)
 def handle_invalid_usage(error):
     return jsonify(error.to_dict()), error.status_code
 
 # generate sitemap with all your endpoints
 
 
-@app.route("/")
+@api.route("/")
 def sitemap():
-    return generate_sitemap(app)
+    response = sitemap_response("json" if wants_json() else "html")
+    response.vary.add("Accept")
+    return response
+
+
+@api.route("/routes", methods=["GET"])
+def routes():
+    return sitemap_response("json")
+
+
+@api.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(get_cache().stats()), 200
+
+
+@api.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+@api.route("/healthz", methods=["GET"])
+@unmetered
+def healthz():
+    return jsonify(liveness()), 200
+
+
+@api.route("/readyz", methods=["GET"])
+@unmetered
+def readyz():
+    body, status = readiness()
+    return jsonify(body), status
+
+@api.route("/search", methods=["GET"])
+@conditional(Characters, Planets, Vehicles)
+def get_search():
+    return jsonify(search()), 200
 
 # <-- User Methods -->
 
 
-@app.route("/user", methods=["GET"])
+@api.route("/user", methods=["GET"])
+@conditional(User)
 def handle_hello():
+    if wants_stream():
+        return streamed_list(User, "users", allowed=("id", "username", "email"))
+
     users = User.query.all()
     if not users:
         raise APIException(
@@ -60,7 +189,7 @@ def handle_hello():
     return jsonify(response_body), 200
 
 
-@app.route("/user", methods=["POST"])
+@api.route("/user", methods=["POST"])
 def post_user():
     request_body = request.get_json(silent=True)
     if request_body is None:
@@ -79,7 +208,7 @@ def post_user():
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/user/<int:user_id>", methods=["PUT"])
+@api.route("/user/<int:user_id>", methods=["PUT"])
 def put_user(user_id):
     request_body = request.get_json(force=True)
     user = User.query.get(user_id)
@@ -98,7 +227,7 @@ def put_user(user_id):
     return jsonify({"msg": "Updated"}), 200
 
 
-@app.route("/user/<int:user_id>", methods=["DELETE"])
+@api.route("/user/<int:user_id>", methods=["DELETE"])
 def delete_user(user_id):
     user = User.query.get(user_id)
     if user is None:
@@ -110,26 +239,17 @@ def delete_user(user_id):
 # <-- Characters Methods -->
 
 
-@app.route("/characters", methods=["GET"])
+@api.route("/characters", methods=["GET"])
+@conditional(Characters)
 def get_characters():
-    characters = Characters.query.all()
-
-    if not characters:
-        response_body = {
-            "msg": "No characters available."
-        }
-    else:
-        all_characters = list(
-            map(lambda characters: characters.serialize(), characters))
-        response_body = {
-            "msg": "GET /characters response",
-            "characters": all_characters
-        }
+    if wants_stream():
+        return streamed_list(Characters, "characters")
 
-    return jsonify(response_body), 200
+    return cached_list(
+        Characters, "characters", "GET /characters response", "No characters available.")
 
 
-@app.route("/characters", methods=["POST"])
+@api.route("/characters", methods=["POST"])
 def post_character():
     request_body = request.get_json(silent=True)
     if request_body is None:
@@ -148,7 +268,28 @@ def post_character():
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/characters/<int:character_uid>", methods=["PUT"])
+@api.route("/characters/bulk", methods=["POST"])
+def post_characters_bulk():
+    response_body, status_code = bulk_insert(Characters)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/characters/bulk", methods=["PUT"])
+def put_characters_bulk():
+    response_body, status_code = bulk_upsert(Characters)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/characters/<int:character_uid>", methods=["GET"])
+@conditional(Characters, Characters_Details, Planets, Planets_Details)
+@query_budget(2)
+def get_character(character_uid):
+    return expanded_detail(Characters, "characters", character_uid, "Character not found")
+
+
+@api.route("/characters/<int:character_uid>", methods=["PUT"])
 def put_character(character_uid):
     request_body = request.get_json(silent=True)
 
@@ -170,7 +311,7 @@ def put_character(character_uid):
     return jsonify({"msg": "Updated"}), 200
 
 
-@app.route("/characters/<int:character_uid>", methods=["DELETE"])
+@api.route("/characters/<int:character_uid>", methods=["DELETE"])
 def delete_character(character_uid):
     character = Characters.query.filter_by(uid=character_uid).first()
 
@@ -184,25 +325,34 @@ def delete_character(character_uid):
 # <-- Characters Details -->
 
 
-@app.route("/characters/details/<int:character_uid>", methods=["GET"])
-def get_characters_details(character_uid):
-    characters_details = Characters_Details.query.filter_by(
-        uid=character_uid).first()
+@api.route("/characters/details", methods=["GET"])
+@conditional(Characters_Details)
+def get_characters_details_list():
+    if "uids" in request.args:
+        return jsonify(batch_details(Characters_Details, "characters_details")), 200
+
+    filters = parse_filters(Characters_Details)
+    if wants_stream():
+        return streamed_list(Characters_Details, "characters_details", filters=filters)
+
+    return cached_list(
+        Characters_Details, "characters_details", "GET /characters/details response",
+        "No character details match.", filters=filters)
 
-    if not characters_details:
-        response_body = {
-            "msg": "No character details available."
-        }
-        return jsonify(response_body), 404
-    else:
-        response_body = {
-            "msg": "ok",
-            "characters_details": characters_details.serialize()
-        }
-        return jsonify(response_body), 200
 
+@api.route("/characters/details/batch", methods=["POST"])
+def post_characters_details_batch():
+    return jsonify(batch_details(Characters_Details, "characters_details")), 200
 
-@app.route("/characters/details", methods=["POST"])
+
+@api.route("/characters/details/<int:character_uid>", methods=["GET"])
+@conditional(Characters_Details)
+def get_characters_details(character_uid):
+    return cached_detail(
+        Characters_Details, "characters_details", character_uid, "No character details available.")
+
+
+@api.route("/characters/details", methods=["POST"])
 def post_character_details():
     request_body = request.get_json(silent=True)
     if request_body is None:
@@ -243,7 +393,21 @@ def post_character_details():
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/characters/details/<int:character_uid>", methods=["PUT"])
+@api.route("/characters/details/bulk", methods=["POST"])
+def post_character_details_bulk():
+    response_body, status_code = bulk_insert(Characters_Details)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/characters/details/bulk", methods=["PUT"])
+def put_character_details_bulk():
+    response_body, status_code = bulk_upsert(Characters_Details)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/characters/details/<int:character_uid>", methods=["PUT"])
 def put_character_details(character_uid):
     request_body = request.get_json(silent=True)
 
@@ -278,7 +442,7 @@ def put_character_details(character_uid):
     return jsonify({"msg": "Updated"}), 200
 
 
-@app.route("/characters/details/<int:character_uid>", methods=["DELETE"])
+@api.route("/characters/details/<int:character_uid>", methods=["DELETE"])
 def delete_character_details(character_uid):
     character_details = Characters_Details.query.filter_by(
         uid=character_uid).first()
@@ -293,24 +457,17 @@ def delete_character_details(character_uid):
 # <-- Planets Methods -->
 
 
-@app.route("/planets", methods=["GET"])
+@api.route("/planets", methods=["GET"])
+@conditional(Planets)
 def get_planets():
-    planets = Planets.query.all()
+    if wants_stream():
+        return streamed_list(Planets, "planets")
 
-    if not planets:
-        response_body = {
-            "msg": "No planets available"
-        }
-    else:
-        all_planets = list(map(lambda planets: planets.serialize(), planets))
-        response_body = {
-            "msg": "GET/ planets response",
-            "planets": all_planets
-        }
-    return jsonify(response_body), 200
+    return cached_list(
+        Planets, "planets", "GET/ planets response", "No planets available")
 
 
-@app.route("/planets", methods=["POST"])
+@api.route("/planets", methods=["POST"])
 def post_planets():
     request_body = request.get_json(silent=True)
 
@@ -330,7 +487,28 @@ def post_planets():
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/planets/<int:planet_uid>", methods=["PUT"])
+@api.route("/planets/bulk", methods=["POST"])
+def post_planets_bulk():
+    response_body, status_code = bulk_insert(Planets)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/planets/bulk", methods=["PUT"])
+def put_planets_bulk():
+    response_body, status_code = bulk_upsert(Planets)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/planets/<int:planet_uid>", methods=["GET"])
+@conditional(Planets, Planets_Details)
+@query_budget(2)
+def get_planet(planet_uid):
+    return expanded_detail(Planets, "planets", planet_uid, "Planet not found")
+
+
+@api.route("/planets/<int:planet_uid>", methods=["PUT"])
 def put_planet(planet_uid):
     request_body = request.get_json(silent=True)
     planet = Planets.query.filter_by(uid=planet_uid).first()
@@ -351,7 +529,7 @@ def put_planet(planet_uid):
     return jsonify({"msg": "Completed"}), 200
 
 
-@app.route("/planets/<int:planet_uid>", methods=["DELETE"])
+@api.route("/planets/<int:planet_uid>", methods=["DELETE"])
 def delete_planet(planet_uid):
     planet = Planets.query.filter_by(uid=planet_uid).first()
 
@@ -367,25 +545,34 @@ def delete_planet(planet_uid):
 
 # <-- Planets Details -->
 
-@app.route("/planets/details/<int:planet_uid>", methods=["GET"])
-def get_planets_details(planet_uid):
-    planets_details = Planets_Details.query.filter_by(
-        uid=planet_uid).first()
+@api.route("/planets/details", methods=["GET"])
+@conditional(Planets_Details)
+def get_planets_details_list():
+    if "uids" in request.args:
+        return jsonify(batch_details(Planets_Details, "planets_details")), 200
+
+    filters = parse_filters(Planets_Details)
+    if wants_stream():
+        return streamed_list(Planets_Details, "planets_details", filters=filters)
+
+    return cached_list(
+        Planets_Details, "planets_details", "GET /planets/details response",
+        "No planet details match.", filters=filters)
 
-    if not planets_details:
-        response_body = {
-            "msg": "No planet details available."
-        }
-        return jsonify(response_body), 404
-    else:
-        response_body = {
-            "msg": "ok",
-            "planets_details": planets_details.serialize()
-        }
-        return jsonify(response_body), 200
 
+@api.route("/planets/details/batch", methods=["POST"])
+def post_planets_details_batch():
+    return jsonify(batch_details(Planets_Details, "planets_details")), 200
 
-@app.route("/planets/details", methods=["POST"])
+
+@api.route("/planets/details/<int:planet_uid>", methods=["GET"])
+@conditional(Planets_Details)
+def get_planets_details(planet_uid):
+    return cached_detail(
+        Planets_Details, "planets_details", planet_uid, "No planet details available.")
+
+
+@api.route("/planets/details", methods=["POST"])
 def post_planet_details():
     request_body = request.get_json(silent=True)
     if request_body is None:
@@ -423,7 +610,21 @@ def post_planet_details():
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/planets/details/<int:planet_uid>", methods=["PUT"])
+@api.route("/planets/details/bulk", methods=["POST"])
+def post_planet_details_bulk():
+    response_body, status_code = bulk_insert(Planets_Details)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/planets/details/bulk", methods=["PUT"])
+def put_planet_details_bulk():
+    response_body, status_code = bulk_upsert(Planets_Details)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/planets/details/<int:planet_uid>", methods=["PUT"])
 def put_planet_details(planet_uid):
     request_body = request.get_json(silent=True)
 
@@ -456,7 +657,7 @@ def put_planet_details(planet_uid):
     return jsonify({"msg": "Updated"}), 200
 
 
-@app.route("/planets/details/<int:planet_uid>", methods=["DELETE"])
+@api.route("/planets/details/<int:planet_uid>", methods=["DELETE"])
 def delete_planet_details(planet_uid):
     planet_details = Planets_Details.query.filter_by(
         uid=planet_uid).first()
@@ -470,25 +671,17 @@ def delete_planet_details(planet_uid):
 
 # <-- Vehicles Methods -->
 
-@app.route("/vehicles", methods=["GET"])
+@api.route("/vehicles", methods=["GET"])
+@conditional(Vehicles)
 def get_vehicles():
-    vehicles = Vehicles.query.all()
+    if wants_stream():
+        return streamed_list(Vehicles, "vehicles")
 
-    if not vehicles:
-        response_body = {
-            "msg": "No vehicles available"
-        }
-    else:
-        all_vehicles = list(
-            map(lambda vehicles: vehicles.serialize(), vehicles))
-        response_body = {
-            "msg": "GET/ vehicles response",
-            "vehicles": all_vehicles
-        }
-    return jsonify(response_body), 200
+    return cached_list(
+        Vehicles, "vehicles", "GET/ vehicles response", "No vehicles available")
 
 
-@app.route("/vehicles", methods=["POST"])
+@api.route("/vehicles", methods=["POST"])
 def post_vehicles():
     request_body = request.get_json(silent=True)
 
@@ -508,7 +701,28 @@ def post_vehicles():
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/vehicles/<int:vehicle_uid>", methods=["PUT"])
+@api.route("/vehicles/bulk", methods=["POST"])
+def post_vehicles_bulk():
+    response_body, status_code = bulk_insert(Vehicles)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/vehicles/bulk", methods=["PUT"])
+def put_vehicles_bulk():
+    response_body, status_code = bulk_upsert(Vehicles)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/vehicles/<int:vehicle_uid>", methods=["GET"])
+@conditional(Vehicles, Vehicles_Details)
+@query_budget(2)
+def get_vehicle(vehicle_uid):
+    return expanded_detail(Vehicles, "vehicles", vehicle_uid, "Vehicle not found")
+
+
+@api.route("/vehicles/<int:vehicle_uid>", methods=["PUT"])
 def put_vehicle(vehicle_uid):
     request_body = request.get_json(silent=True)
     vehicle = Vehicles.query.filter_by(uid=vehicle_uid).first()
@@ -529,7 +743,7 @@ def put_vehicle(vehicle_uid):
     return jsonify({"msg": "Completed"}), 200
 
 
-@app.route("/vehicles/<int:vehicle_uid>", methods=["DELETE"])
+@api.route("/vehicles/<int:vehicle_uid>", methods=["DELETE"])
 def delete_vehicle(vehicle_uid):
     vehicle = Vehicles.query.filter_by(uid=vehicle_uid).first()
 
@@ -542,25 +756,34 @@ def delete_vehicle(vehicle_uid):
 
 # <-- Vehicles Details -->
 
-@app.route("/vehicles/details/<int:vehicle_uid>", methods=["GET"])
-def get_vehicles_details(vehicle_uid):
-    vehicles_details = Vehicles_Details.query.filter_by(
-        uid=vehicle_uid).first()
+@api.route("/vehicles/details", methods=["GET"])
+@conditional(Vehicles_Details)
+def get_vehicles_details_list():
+    if "uids" in request.args:
+        return jsonify(batch_details(Vehicles_Details, "vehicles_details")), 200
+
+    filters = parse_filters(Vehicles_Details)
+    if wants_stream():
+        return streamed_list(Vehicles_Details, "vehicles_details", filters=filters)
+
+    return cached_list(
+        Vehicles_Details, "vehicles_details", "GET /vehicles/details response",
+        "No vehicle details match.", filters=filters)
 
-    if not vehicles_details:
-        response_body = {
-            "msg": "No vehicle details available."
-        }
-        return jsonify(response_body), 404
-    else:
-        response_body = {
-            "msg": "ok",
-            "vehicles_details": vehicles_details.serialize()
-        }
-        return jsonify(response_body), 200
 
+@api.route("/vehicles/details/batch", methods=["POST"])
+def post_vehicles_details_batch():
+    return jsonify(batch_details(Vehicles_Details, "vehicles_details")), 200
 
-@app.route("/vehicles/details", methods=["POST"])
+
+@api.route("/vehicles/details/<int:vehicle_uid>", methods=["GET"])
+@conditional(Vehicles_Details)
+def get_vehicles_details(vehicle_uid):
+    return cached_detail(
+        Vehicles_Details, "vehicles_details", vehicle_uid, "No vehicle details available.")
+
+
+@api.route("/vehicles/details", methods=["POST"])
 def post_vehicle_details():
     request_body = request.get_json(silent=True)
     if request_body is None:
@@ -608,7 +831,21 @@ def post_vehicle_details():
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/vehicles/details/<int:vehicle_uid>", methods=["PUT"])
+@api.route("/vehicles/details/bulk", methods=["POST"])
+def post_vehicle_details_bulk():
+    response_body, status_code = bulk_insert(Vehicles_Details)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/vehicles/details/bulk", methods=["PUT"])
+def put_vehicle_details_bulk():
+    response_body, status_code = bulk_upsert(Vehicles_Details)
+
+    return jsonify(response_body), status_code
+
+
+@api.route("/vehicles/details/<int:vehicle_uid>", methods=["PUT"])
 def put_vehicle_details(vehicle_uid):
     request_body = request.get_json(silent=True)
 
@@ -647,7 +884,7 @@ def put_vehicle_details(vehicle_uid):
     return jsonify({"msg": "Updated"}), 200
 
 
-@app.route("/vehicles/details/<int:vehicle_uid>", methods=["DELETE"])
+@api.route("/vehicles/details/<int:vehicle_uid>", methods=["DELETE"])
 def delete_vehicle_details(vehicle_uid):
     vehicle_details = Vehicles_Details.query.filter_by(
         uid=vehicle_uid).first()
@@ -661,26 +898,13 @@ def delete_vehicle_details(vehicle_uid):
 
 # <-- Favorites -->
 
-@app.route("/user/favorites/<int:user_id>", methods=["GET"])
+@api.route("/user/favorites/<int:user_id>", methods=["GET"])
+@conditional(Favorite_Characters, Favorite_Planets, Favorite_Vehicles,
+             Characters, Planets, Vehicles)
 def get_favorites(user_id):
-    favorite_characters = Favorite_Characters.query.filter_by(user_id=user_id)
-    all_characters_favorites = list(
-        map(lambda characters: characters.serialize, favorite_characters))
-
-    favorite_planets = Favorite_Planets.query.filter_by(user_id=user_id)
-    all_planets_favorites = list(
-        map(lambda planets: planets.serialize, favorite_planets))
-
-    favorite_vehicles = Favorite_Vehicles.query.filter_by(user_id=user_id)
-    all_vehicles_favorites = list(
-        map(lambda vehicles: vehicles.serialize, favorite_vehicles))
-
+    expand = request.args.get("expand", "").split(",")
     response_body = {
-        "favorites": {
-            "characters": all_characters_favorites,
-            "planets": all_planets_favorites,
-            "vehicles": all_vehicles_favorites
-        }
+        "favorites": get_user_favorites(user_id, embed="entity" in expand)
     }
 
     return jsonify(response_body), 200
@@ -688,7 +912,7 @@ def get_favorites(user_id):
 # <-- Favorite Characters -->
 
 
-@app.route("/favorite/characters/<int:user_id>", methods=["POST"])
+@api.route("/favorite/characters/<int:user_id>", methods=["POST"])
 def post_favorite_characters(user_id):
     request_body = request.get_json(silent=True)
 
@@ -705,7 +929,7 @@ def post_favorite_characters(user_id):
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/favorite/characters/<int:user_id>/<int:character_id>", methods=["DELETE"])
+@api.route("/favorite/characters/<int:user_id>/<int:character_id>", methods=["DELETE"])
 def delete_favorite_character(user_id, character_id):
     favorite_character = Favorite_Characters.query.filter_by(
         user_id=user_id, character_id=character_id).first()
@@ -720,7 +944,7 @@ def delete_favorite_character(user_id, character_id):
 # <-- Favorite Planets -->
 
 
-@app.route("/favorite/planets/<int:user_id>", methods=["POST"])
+@api.route("/favorite/planets/<int:user_id>", methods=["POST"])
 def post_favorite_planets(user_id):
     request_body = request.get_json(silent=True)
 
@@ -737,7 +961,7 @@ def post_favorite_planets(user_id):
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/favorite/planets/<int:user_id>/<int:planet_id>", methods=["DELETE"])
+@api.route("/favorite/planets/<int:user_id>/<int:planet_id>", methods=["DELETE"])
 def delete_favorite_planet(user_id, planet_id):
     favorite_planet = Favorite_Planets.query.filter_by(
         user_id=user_id, planet_id=planet_id).first()
@@ -752,7 +976,7 @@ def delete_favorite_planet(user_id, planet_id):
 # <-- Favorite Vehicles -->
 
 
-@app.route("/favorite/vehicles/<int:user_id>", methods=["POST"])
+@api.route("/favorite/vehicles/<int:user_id>", methods=["POST"])
 def post_favorite_vehicles(user_id):
     request_body = request.get_json(silent=True)
 
@@ -769,7 +993,7 @@ def post_favorite_vehicles(user_id):
     return jsonify({"msg": "Completed"}), 201
 
 
-@app.route("/favorite/vehicles/<int:user_id>/<int:vehicle_id>", methods=["DELETE"])
+@api.route("/favorite/vehicles/<int:user_id>/<int:vehicle_id>", methods=["DELETE"])
 def delete_favorite_vehicle(user_id, vehicle_id):
     favorite_vehicle = Favorite_Vehicles.query.filter_by(
         user_id=user_id, vehicle_id=vehicle_id).first()
@@ -785,4 +1009,4 @@ def delete_favorite_vehicle(user_id, vehicle_id):
 # this only runs if `$ python src/app.py` is executed
 if __name__ == "__main__":
     PORT = int(os.environ.get("PORT", 3000))
-    app.run(host="0.0.0.0", port=PORT, debug=False)
+    create_app().run(host="0.0.0.0", port=PORT, debug=False)
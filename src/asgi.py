@@ -0,0 +1,207 @@
+"""
+ASGI entry point, the async counterpart of wsgi.py:
+
+    $ uvicorn asgi:application --app-dir src --workers 2
+
+GET /user/favorites/<user_id> is served natively on SQLAlchemy's asyncio
+engine (aiosqlite for sqlite, asyncpg for postgres), its three lookups in
+flight at once, so a slow query only parks a coroutine. Every other route is
+the regular Flask app, run on a thread pool (ASGI_THREADS) by WsgiBridge.
+Without an async driver for the database everything goes through Flask.
+The native route skips the Flask hooks: no ETag, compression or /metrics.
+
+uvicorn, asgiref, aiosqlite and asyncpg are in the Pipfile.
+"""
+import logging
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qs
+from asgiref.sync import async_to_sync, sync_to_async
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import create_app
+from favorites import get_user_favorites_async
+from pool import engine_options
+
+logger = logging.getLogger("api.asgi")
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_url(url):
+    scheme, _, rest = url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    return f"{driver}://{rest}" if driver is not None else None
+
+
+def async_engine(url):
+    options = engine_options(url)
+    # the sync pool class and psycopg2 connect args do not apply here
+    options.pop("poolclass", None)
+    options.pop("connect_args", None)
+    return create_async_engine(async_url(url), **options)
+
+
+# <-- WSGI bridge -->
+# asgiref's WsgiToAsgi runs every call on one shared thread, which would
+# serialize all the Flask routes of the worker; this one uses a thread pool
+
+
+def wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = value.decode("latin1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class WsgiBridge:
+    def __init__(self, wsgi_application, executor):
+        self.wsgi_application = wsgi_application
+        self.run = sync_to_async(self.run_wsgi, thread_sensitive=False, executor=executor)
+
+    async def __call__(self, scope, receive, send):
+        # request bodies past 1 MB are spooled to disk
+        body = SpooledTemporaryFile(max_size=1024 * 1024)
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.write(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+        await self.run(wsgi_environ(scope, body), send)
+
+    def run_wsgi(self, environ, send):
+        # on a pool thread: chunks are sent as the app yields them, so
+        # streamed responses stay streamed
+        send = async_to_sync(send)
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and response.get("sent"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["start"] = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin1"), value.encode("latin1"))
+                            for name, value in headers]}
+
+        def start():
+            if not response.get("sent"):
+                response["sent"] = True
+                send(response["start"])
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    start()
+                    send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        start()
+        send({"type": "http.response.body", "body": b""})
+
+
+# <-- Application -->
+
+
+class Application:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = None
+        self.engines = None
+        self.routes = [
+            (re.compile(r"/user/favorites/(\d+)/?"), self.get_favorites),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if self.engines is None:
+            self.startup()
+
+        if self.engines and scope["type"] == "http" and scope["method"] == "GET":
+            for pattern, view in self.routes:
+                match = pattern.fullmatch(scope["path"])
+                if match is not None:
+                    return await view(scope, send, *match.groups())
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def startup(self):
+        config = self.flask_app.config
+        self.wsgi = WsgiBridge(self.flask_app, ThreadPoolExecutor(
+            config["ASGI_THREADS"], thread_name_prefix="wsgi"))
+
+        # reads go to the replicas when there are any, like RoutingSession
+        urls = config["DATABASE_REPLICA_URLS"] or [config["SQLALCHEMY_DATABASE_URI"]]
+        self.engines = []
+        if not all(async_url(url) for url in urls):
+            logger.warning("no async driver for %s, serving every route through Flask",
+                           urls[0].partition("://")[0])
+            return
+        try:
+            self.engines = [async_engine(url) for url in urls]
+        except ImportError as error:
+            logger.warning("%s, serving every route through Flask", error)
+            return
+        self.next_engine = cycle(self.engines).__next__
+
+    async def shutdown(self):
+        for engine in self.engines or ():
+            await engine.dispose()
+
+    async def get_favorites(self, scope, send, user_id):
+        expand = ",".join(parse_qs(scope["query_string"].decode())
+                          .get("expand", [])).split(",")
+        favorites = await get_user_favorites_async(
+            self.next_engine(), int(user_id), embed="entity" in expand)
+        await self.send_json(scope, send, 200, {"favorites": favorites})
+
+    async def send_json(self, scope, send, status, payload):
+        body = self.flask_app.json.dumpb(payload)
+        headers = [(b"content-type", b"application/json"),
+                   (b"content-length", str(len(body)).encode())]
+        if any(name == b"origin" for name, _ in scope["headers"]):
+            headers.append((b"access-control-allow-origin", b"*"))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+application = Application(create_app())
@@ -0,0 +1,50 @@
+"""
+Batch lookup of detail rows by uid: GET /<resource>/details?uids=1,2,3 and
+POST /<resource>/details/batch for lists too long for a URL. One IN query
+per chunk of uids, rows come back in the order they were asked for.
+"""
+from flask import current_app, request
+from sqlalchemy import select
+from models import db
+from utils import APIException, chunks
+
+CHUNK_SIZE = 500
+
+
+def parse_uids(values):
+    if isinstance(values, str):
+        values = [value for value in values.split(",") if value.strip()]
+    if not isinstance(values, list) or not values:
+        raise APIException("You must send a list of uids!", status_code=400)
+    try:
+        # dict keeps the first position of every uid and drops repeats
+        uids = list(dict.fromkeys(int(value) for value in values))
+    except (TypeError, ValueError):
+        raise APIException("uids must be integers", status_code=400)
+    if len(uids) > current_app.config["MAX_BATCH_UIDS"]:
+        raise APIException(
+            f"At most {current_app.config['MAX_BATCH_UIDS']} uids per request", status_code=400)
+    return uids
+
+
+def batch_uids():
+    if request.method == "GET":
+        return parse_uids(request.args.get("uids", ""))
+    body = request.get_json(silent=True)
+    return parse_uids(body.get("uids") if isinstance(body, dict) else body)
+
+
+def batch_details(model, key):
+    uids = batch_uids()
+    columns = model.__table__.columns
+    keys = columns.keys()
+    found = {}
+    for chunk in chunks(uids, CHUNK_SIZE):
+        for row in db.session.execute(select(*columns).where(model.uid.in_(chunk))):
+            found[row.uid] = dict(zip(keys, row))
+
+    return {
+        "msg": "ok",
+        key: [found[uid] for uid in uids if uid in found],
+        "missing": [uid for uid in uids if uid not in found]
+    }
@@ -0,0 +1,239 @@
+"""
+Bulk insert and upsert of catalog rows: one validation pass, executemany
+batches inside the request's unit of work
+"""
+import hashlib
+import json
+from flask import current_app, request
+from sqlalchemy import Float, Integer, bindparam, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from cache import invalidate_later
+from conditional import touch
+from models import db, save, savepoint
+from search import SEARCHABLE, reindex
+from utils import APIException, chunks
+
+
+def read_bulk_payload():
+    if request.mimetype == "application/x-ndjson":
+        try:
+            items = [json.loads(line) for line in request.get_data(
+                as_text=True).splitlines() if line.strip()]
+        except ValueError:
+            raise APIException("Invalid NDJSON body", status_code=400)
+    else:
+        items = request.get_json(silent=True)
+
+    if not isinstance(items, list) or not items:
+        raise APIException("You must send a list of items!", status_code=400)
+    return items
+
+
+def batch_size():
+    try:
+        size = int(request.args.get(
+            "batch_size", current_app.config["BULK_BATCH_SIZE"]))
+    except ValueError:
+        raise APIException("batch_size must be an integer", status_code=400)
+    if size < 1:
+        raise APIException("batch_size must be greater than 0", status_code=400)
+    return size
+
+
+def existing_values(column, values, size):
+    found = set()
+    for chunk in chunks(list(values), size):
+        found.update(db.session.execute(
+            db.select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def validate_items(model, items, size, key=None):
+    table = model.__table__
+    writable = set(table.columns.keys()) - {"id"}
+    unique = [column for column in table.columns
+              if column.unique and column.name in writable]
+    foreign = [(column, next(iter(column.foreign_keys)).column)
+               for column in table.columns if column.foreign_keys]
+
+    errors = {}
+    rows = {}
+    seen = {column.name: set() for column in unique}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = "Item must be an object"
+            continue
+        missing = [field for field in model.required_fields if field not in item]
+        if missing:
+            errors[index] = f"Missing fields: {', '.join(missing)}"
+            continue
+        if key is not None and item[key] is None:
+            errors[index] = f"{key} must not be null"
+            continue
+        unknown = [field for field in item if field not in writable]
+        if unknown:
+            errors[index] = f"Unknown fields: {', '.join(unknown)}"
+            continue
+        duplicated = [column.name for column in unique
+                      if item.get(column.name) is not None and item[column.name] in seen[column.name]]
+        if duplicated:
+            errors[index] = f"Duplicated in request: {', '.join(duplicated)}"
+            continue
+        for column in unique:
+            if item.get(column.name) is not None:
+                seen[column.name].add(item[column.name])
+        rows[index] = item
+
+    # one IN query per constrained column instead of one lookup per row; an
+    # upsert expects its rows to exist, other clashes are left to the database
+    for column in (unique if key is None else ()):
+        taken = existing_values(
+            column, {row[column.name] for row in rows.values()
+                     if row.get(column.name) is not None}, size)
+        for index, row in list(rows.items()):
+            if row.get(column.name) in taken:
+                errors[index] = f"{column.name} {row[column.name]} already exists"
+                del rows[index]
+    for column, target in foreign:
+        present = existing_values(
+            target, {row[column.name] for row in rows.values()
+                     if row.get(column.name) is not None}, size)
+        for index, row in list(rows.items()):
+            value = row.get(column.name)
+            if value is not None and value not in present:
+                errors[index] = f"{column.name} {value} does not exist"
+                del rows[index]
+
+    return rows, errors
+
+
+def bulk_insert(model):
+    items = read_bulk_payload()
+    size = batch_size()
+    rows, errors = validate_items(model, items, size)
+    columns = model.__table__.columns.keys()
+
+    # executemany needs every row to carry the same keys
+    values = [{name: row.get(name) for name in columns if name != "id"}
+              for _, row in sorted(rows.items())]
+    try:
+        with savepoint():
+            for batch in chunks(values, size):
+                db.session.execute(model.__table__.insert(), batch)
+    except IntegrityError as error:
+        raise APIException("Bulk insert failed, nothing was saved", status_code=409,
+                           payload={"detail": str(error.orig)})
+    if values:
+        invalidate_later(db.session, model.__tablename__)
+        touch(db.session, model.__tablename__)
+        if model.__tablename__ in SEARCHABLE:
+            # Core inserts skip the flush hook that keeps the search index current
+            reindex(db.session.connection(), model, model.uid,
+                    {row["uid"] for row in values if row["uid"] is not None})
+        save()
+
+    response_body = {
+        "msg": "Completed" if not errors else "Completed with errors",
+        "inserted": len(values),
+        "errors": [{"index": index, "error": error}
+                   for index, error in sorted(errors.items())]
+    }
+    return response_body, 201 if values else 400
+
+
+# <-- Upsert -->
+
+
+def normalize(column, value):
+    # "77" from JSON and 77 from the database are the same content
+    try:
+        if value is not None and isinstance(column.type, Integer):
+            return int(value)
+        if value is not None and isinstance(column.type, Float):
+            return float(value)
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def content_hash(columns, row):
+    values = tuple(normalize(column, row.get(column.name)) for column in columns)
+    return hashlib.blake2b(repr(values).encode(), digest_size=16).digest()
+
+
+def existing_hashes(model, columns, uids, size):
+    hashes = {}
+    for chunk in chunks(uids, size):
+        for row in db.session.execute(select(*columns).where(model.uid.in_(chunk))):
+            hashes[row.uid] = content_hash(columns, row._mapping)
+    return hashes
+
+
+def upsert_statement(table, columns, dialect):
+    updates = [column.name for column in columns if column.name != "uid"]
+    if dialect in ("sqlite", "postgresql"):
+        insert = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        return insert.on_conflict_do_update(
+            index_elements=["uid"], set_={name: insert.excluded[name] for name in updates})
+    if dialect in ("mysql", "mariadb"):
+        insert = mysql.insert(table)
+        return insert.on_duplicate_key_update({name: insert.inserted[name] for name in updates})
+    return None
+
+
+def write_upserts(model, columns, values, existing, size):
+    table = model.__table__
+    statement = upsert_statement(table, columns, db.session.get_bind().dialect.name)
+    if statement is not None:
+        for batch in chunks(values, size):
+            db.session.execute(statement, batch)
+        return
+
+    # no native upsert: plain inserts for new uids, keyed updates for the rest
+    new = [row for row in values if row["uid"] not in existing]
+    changed = [dict(row, match_uid=row["uid"]) for row in values if row["uid"] in existing]
+    update = table.update().where(table.c.uid == bindparam("match_uid"))
+    for batch in chunks(new, size):
+        db.session.execute(table.insert(), batch)
+    for batch in chunks(changed, size):
+        db.session.execute(update, batch)
+
+
+def bulk_upsert(model):
+    items = read_bulk_payload()
+    size = batch_size()
+    rows, errors = validate_items(model, items, size, key="uid")
+    table = model.__table__
+    columns = [column for column in table.columns if column.name != "id"]
+
+    values = [{column.name: row.get(column.name) for column in columns}
+              for _, row in sorted(rows.items())]
+    # a no-op sync only reads: rows whose content did not change are not sent
+    existing = existing_hashes(model, columns, [row["uid"] for row in values], size)
+    changed = [row for row in values if existing.get(row["uid"]) != content_hash(columns, row)]
+    inserted = sum(1 for row in changed if row["uid"] not in existing)
+
+    try:
+        with savepoint():
+            write_upserts(model, columns, changed, existing, size)
+    except IntegrityError as error:
+        raise APIException("Bulk upsert failed, nothing was saved", status_code=409,
+                           payload={"detail": str(error.orig)})
+    if changed:
+        uids = {row["uid"] for row in changed}
+        invalidate_later(db.session, model.__tablename__)
+        touch(db.session, model.__tablename__)
+        if model.__tablename__ in SEARCHABLE:
+            reindex(db.session.connection(), model, model.uid, uids)
+        save()
+
+    response_body = {
+        "msg": "Completed" if not errors else "Completed with errors",
+        "inserted": inserted,
+        "updated": len(changed) - inserted,
+        "unchanged": len(values) - len(changed),
+        "errors": [{"index": index, "error": error}
+                   for index, error in sorted(errors.items())]
+    }
+    return response_body, 200 if values else 400
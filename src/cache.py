@@ -0,0 +1,340 @@
+"""
+Response cache for the list and detail endpoints.
+
+CACHE_BACKEND picks where the pre-serialized JSON bodies live:
+  memory  in-process LRU + TTL, fine for a single worker
+  sqlite  a file shared by every gunicorn worker on the host (CACHE_URL is its path)
+  redis   a Redis server shared by every host (CACHE_URL is its redis:// url)
+
+Writes are picked up from the session: every flushed insert/update/delete
+is published as an invalidation once the transaction commits. Bodies are
+always built from the primary: a replica lagging behind the commit that bumped
+the generation would store its stale rows under the new key.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from flask import Response, current_app, has_app_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from compression import compress, encode_response, negotiate
+from listing import paginated_list
+from models import db
+from routing import primary_reads
+
+
+class CacheBackend:
+    name = None
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self.stats_lock = threading.Lock()
+
+    def get(self, key, count=True):
+        # hits and misses count body lookups; a request's compressed copy is
+        # looked up with count=False so it is not counted a second time
+        value = self._get(key)
+        if count:
+            with self.stats_lock:
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._set(key, value, self.ttl)
+
+    def generation(self, table):
+        # list and detail bodies are keyed by a per-table generation, bumping it
+        # drops them all at once; a lost counter restarts from the clock, never
+        # from 0
+        value = self._get(table + ":generation")
+        if value is None:
+            return self.bump(table)
+        return int(value)
+
+    def bump(self, table):
+        return self._incr(table + ":generation", time.time_ns())
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class LRUCache(CacheBackend):
+    name = "memory"
+
+    def __init__(self, max_entries, ttl):
+        super().__init__(max_entries, ttl)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = self.expirations = 0
+
+    def _get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def _incr(self, key, initial):
+        with self.lock:
+            value, _ = self.entries.get(key, (initial - 1, None))
+            self.entries[key] = (value + 1, float("inf"))
+            self.entries.move_to_end(key)
+            return value + 1
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(entries=len(self.entries), evictions=self.evictions,
+                     expirations=self.expirations)
+        return stats
+
+
+class SQLiteCache(CacheBackend):
+    name = "sqlite"
+    prune_every = 256
+
+    def __init__(self, max_entries, ttl, path):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self.local = threading.local()
+        self.writes = 0
+        self.connection().execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)")
+
+    def connection(self):
+        # sqlite connections must not cross a fork, so they are per process and thread
+        pid, connection = getattr(self.local, "connection", (None, None))
+        if pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = (os.getpid(), connection)
+        return connection
+
+    def _get(self, key):
+        row = self.connection().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def _set(self, key, value, ttl):
+        connection = self.connection()
+        connection.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                           (key, value, time.time() + ttl))
+        self.writes += 1
+        if self.writes % self.prune_every == 0:
+            self.prune(connection)
+
+    def prune(self, connection):
+        connection.execute(
+            "DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        connection.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+            "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def _incr(self, key, initial):
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            value = int(row[0]) + 1 if row is not None else initial
+            connection.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                               (key, str(value), float("inf")))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return value
+
+    def delete(self, *keys):
+        self.connection().executemany(
+            "DELETE FROM cache WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self):
+        self.connection().execute("DELETE FROM cache")
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(entries=self.connection().execute(
+            "SELECT COUNT(*) FROM cache").fetchone()[0], path=self.path)
+        return stats
+
+
+class RedisCache(CacheBackend):
+    name = "redis"
+    prefix = "swapi:"
+
+    def __init__(self, max_entries, ttl, url):
+        super().__init__(max_entries, ttl)
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis needs the redis package (pipenv install redis)")
+        # eviction is left to the server's maxmemory policy
+        self.client = redis.Redis.from_url(url)
+
+    def _get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def _set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def _incr(self, key, initial):
+        self.client.set(self.prefix + key, initial - 1, nx=True)
+        return self.client.incr(self.prefix + key)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(entries=len(list(self.client.scan_iter(self.prefix + "*"))))
+        return stats
+
+
+def create_cache(config):
+    backend = config["CACHE_BACKEND"]
+    max_entries, ttl = config["CACHE_MAX_ENTRIES"], config["CACHE_TTL"]
+    if backend == "memory":
+        return LRUCache(max_entries, ttl)
+    if backend == "sqlite":
+        return SQLiteCache(max_entries, ttl, config["CACHE_URL"] or "/tmp/api-cache.db")
+    if backend == "redis":
+        return RedisCache(max_entries, ttl, config["CACHE_URL"] or "redis://localhost:6379/0")
+    raise RuntimeError(f"Unknown CACHE_BACKEND {backend!r}")
+
+
+def init_cache(app):
+    app.extensions["cache"] = create_cache(app.config)
+
+
+def get_cache():
+    return current_app.extensions["cache"]
+
+
+# <-- Invalidation events -->
+
+
+def invalidate_later(session, table):
+    session.info.setdefault("cache_invalidations", set()).add(table)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_invalidations(session, flush_context):
+    for instance in chain(session.new, session.dirty, session.deleted):
+        invalidate_later(session, instance.__tablename__)
+
+
+@event.listens_for(Session, "after_commit")
+def publish_invalidations(session):
+    pending = session.info.pop("cache_invalidations", None)
+    if not pending or not has_app_context() or "cache" not in current_app.extensions:
+        return
+    # bumped, not deleted: a read that saw the old rows before the commit
+    # can only store its body under the generation it started with
+    cache = get_cache()
+    for table in pending:
+        cache.bump(table)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_invalidations(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("cache_invalidations", None)
+
+
+# <-- Cached responses -->
+
+
+def cached_response(cache, cache_key, body):
+    # compressed copies live next to the raw body, so each entity version is
+    # compressed once instead of once per request
+    response = Response(body, status=200, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(len(body))
+    if encoding is None:
+        return response
+
+    encoded = cache.get(f"{cache_key}|{encoding}", count=False)
+    if encoded is None:
+        encoded = compress(body, encoding)
+        cache.set(f"{cache_key}|{encoding}", encoded)
+    return encode_response(response, encoding, encoded)
+
+
+def cached_list(model, key, msg, empty_msg, filters=()):
+    cache = get_cache()
+    table = model.__tablename__
+    cache_key = f"{table}:list:{cache.generation(table)}:{request.query_string.decode()}"
+    body = cache.get(cache_key)
+    if body is None:
+        with primary_reads(db.session):
+            body = current_app.json.dumpb(
+                paginated_list(model, key, msg, empty_msg, filters=filters))
+        cache.set(cache_key, body)
+
+    return cached_response(cache, cache_key, body)
+
+
+def cached_detail(model, key, uid, empty_msg):
+    cache = get_cache()
+    table = model.__tablename__
+    cache_key = f"{table}:{uid}:{cache.generation(table)}"
+    body = cache.get(cache_key)
+    if body is None:
+        with primary_reads(db.session):
+            row = model.query.filter_by(uid=uid).first()
+            if row is None:
+                return jsonify({"msg": empty_msg}), 404
+            body = current_app.json.dumpb(
+                {"msg": "ok", key: row.serialize()})
+        cache.set(cache_key, body)
+
+    return cached_response(cache, cache_key, body)
@@ -0,0 +1,53 @@
+"""
+Negotiated gzip / brotli compression of JSON and HTML responses
+"""
+import gzip
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ("br", "gzip")
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/html")
+
+
+def available_encodings():
+    return ENCODINGS if brotli is not None else ("gzip",)
+
+
+def negotiate(size):
+    if size < current_app.config["COMPRESS_MIN_SIZE"]:
+        return None
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=current_app.config["COMPRESS_BROTLI_QUALITY"])
+    # mtime=0 keeps the output stable so cached copies stay byte for byte equal
+    return gzip.compress(body, compresslevel=current_app.config["COMPRESS_LEVEL"], mtime=0)
+
+
+def encode_response(response, encoding, body):
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_compression(app):
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        body = response.get_data()
+        encoding = negotiate(len(body))
+        if encoding is None:
+            return response
+        return encode_response(response, encoding, compress(body, encoding))
@@ -0,0 +1,83 @@
+"""
+ETag / Last-Modified support for the GET endpoints, driven by per-table
+version counters instead of hashing response bodies
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+from itertools import chain
+from flask import make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, Table_Version
+
+
+def bump_versions(connection, tables):
+    table = Table_Version.__table__
+    now = datetime.utcnow()
+    for name in sorted(tables):
+        updated = connection.execute(
+            table.update()
+            .where(table.c.table_name == name)
+            .values(version=table.c.version + 1, updated_at=now))
+        if not updated.rowcount:
+            connection.execute(table.insert().values(
+                table_name=name, version=1, updated_at=now))
+
+
+def touch(session, *tables):
+    # for writes that bypass the ORM flush, e.g. Core bulk inserts
+    bump_versions(session.connection(), tables)
+
+
+@event.listens_for(Session, "after_flush")
+def bump_flushed_tables(session, flush_context):
+    tables = {instance.__tablename__ for instance in chain(
+        session.new, session.dirty, session.deleted)}
+    tables.discard(Table_Version.__tablename__)
+    if tables:
+        bump_versions(session.connection(), tables)
+
+
+def table_versions(models):
+    names = [model.__tablename__ for model in models]
+    rows = db.session.execute(
+        db.select(Table_Version.table_name, Table_Version.version, Table_Version.updated_at)
+        .where(Table_Version.table_name.in_(names))).all()
+    found = {row.table_name: row for row in rows}
+    versions = [(name, found[name].version if name in found else 0)
+                for name in names]
+    modified = [row.updated_at for row in rows]
+    return versions, max(modified) if modified else None
+
+
+def conditional(*models):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions, last_modified = table_versions(models)
+            seed = repr((versions, request.full_path, request.headers.get("Accept"),
+                         request.headers.get("Accept-Encoding")))
+            etag = hashlib.blake2b(seed.encode(), digest_size=12).hexdigest()
+            if last_modified is not None:
+                last_modified = last_modified.replace(microsecond=0)
+
+            if request.if_none_match:
+                not_modified = etag in request.if_none_match
+            else:
+                since = request.if_modified_since
+                not_modified = (since is not None and last_modified is not None and
+                                last_modified <= since.replace(tzinfo=None))
+            if not_modified:
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+"""
+?expand= for the single entity endpoints: the entity with its details and,
+for characters, the homeworld with its details, in one joined query instead
+of one request per resource
+"""
+from flask import jsonify, request
+from sqlalchemy.orm import joinedload, raiseload
+from cache import cached_detail
+from models import db, Characters, Planets, Vehicles
+from utils import APIException
+
+
+def serialize_details(details):
+    return details.serialize() if details is not None else None
+
+
+def serialize_homeworld(character):
+    planet = character.details.planets if character.details is not None else None
+    if planet is None:
+        return None
+    return dict(planet.serialize(), details=serialize_details(planet.details))
+
+
+# expand name -> (relationship names to load, how to render them); names,
+# resolved on use, so the mappers are configured by then
+EXPANSIONS = {
+    Characters: {
+        "details": (("details",), lambda character: serialize_details(character.details)),
+        "planet": (("details", "planets", "details"), serialize_homeworld),
+    },
+    Planets: {
+        "details": (("details",), lambda planet: serialize_details(planet.details)),
+    },
+    Vehicles: {
+        "details": (("details",), lambda vehicle: serialize_details(vehicle.details)),
+    },
+}
+
+
+def expand_args(model):
+    names = [name.strip() for name in request.args.get("expand", "").split(",")
+             if name.strip()]
+    unknown = [name for name in names if name not in EXPANSIONS[model]]
+    if unknown:
+        raise APIException(f"Unknown expand: {', '.join(unknown)}", status_code=400)
+    return names
+
+
+def loader_options(model, names):
+    options = []
+    for name in names:
+        path, _ = EXPANSIONS[model][name]
+        option, current = None, model
+        for attribute in path:
+            relationship = getattr(current, attribute)
+            option = joinedload(relationship) if option is None else option.joinedload(relationship)
+            current = relationship.property.mapper.class_
+        options.append(option)
+    # anything not asked for must not sneak in as a lazy load per row
+    return options + [raiseload("*")]
+
+
+def expanded_detail(model, key, uid, empty_msg):
+    names = expand_args(model)
+    if not names:
+        return cached_detail(model, key, uid, empty_msg)
+
+    # not cached: the body depends on rows of several tables
+    row = db.session.execute(
+        db.select(model).where(model.uid == uid)
+        .options(*loader_options(model, names))).unique().scalar_one_or_none()
+    if row is None:
+        return jsonify({"msg": empty_msg}), 404
+
+    body = row.serialize()
+    for name in names:
+        _, render = EXPANSIONS[model][name]
+        body[name] = render(row)
+    return jsonify({"msg": "ok", key: body}), 200
@@ -0,0 +1,80 @@
+"""
+Favorites read path: the three favorite kinds of a user in one UNION ALL
+round-trip, optionally joined with the referenced entity, and the same
+lookups run concurrently on the asyncio engine for the ASGI entry point
+"""
+import asyncio
+from itertools import chain
+from sqlalchemy import literal, select, union_all
+from models import db, Characters, Planets, Vehicles, Favorite_Characters, Favorite_Planets, Favorite_Vehicles
+
+FAVORITE_KINDS = (
+    ("characters", "character", Favorite_Characters,
+     Favorite_Characters.character_id, Characters),
+    ("planets", "planet", Favorite_Planets, Favorite_Planets.planet_id, Planets),
+    ("vehicles", "vehicle", Favorite_Vehicles,
+     Favorite_Vehicles.vehicle_id, Vehicles),
+)
+
+
+def favorites_select(user_id, kind, favorite, foreign_key, entity, embed):
+    columns = [
+        literal(kind).label("kind"),
+        favorite.id.label("id"),
+        foreign_key.label("entity_id")
+    ]
+    if not embed:
+        return select(*columns).where(favorite.user_id == user_id)
+
+    columns += [
+        entity.uid.label("uid"),
+        entity.name.label("name"),
+        entity.url.label("url")
+    ]
+    return (select(*columns)
+            .select_from(favorite)
+            .outerjoin(entity, foreign_key == entity.id)
+            .where(favorite.user_id == user_id))
+
+
+def favorites_payload(user_id, rows, embed):
+    favorites = {kind: [] for kind, *_ in FAVORITE_KINDS}
+    singular = {kind: name for kind, name, *_ in FAVORITE_KINDS}
+    for row in rows:
+        item = {
+            "id": row.id,
+            "user_id": user_id,
+            singular[row.kind] + "_id": row.entity_id
+        }
+        if embed:
+            item[singular[row.kind]] = None if row.uid is None else {
+                "uid": row.uid,
+                "name": row.name,
+                "url": row.url
+            }
+        favorites[row.kind].append(item)
+
+    return favorites
+
+
+def get_user_favorites(user_id, embed=False):
+    statement = union_all(*[
+        favorites_select(user_id, kind, favorite, foreign_key, entity, embed)
+        for kind, _, favorite, foreign_key, entity in FAVORITE_KINDS
+    ])
+    return favorites_payload(user_id, db.session.execute(statement).all(), embed)
+
+
+async def get_user_favorites_async(engine, user_id, embed=False):
+    # the async (ASGI) path: one connection per kind, all three in flight at once
+    async def lookup(kind, favorite, foreign_key, entity):
+        async with engine.connect() as connection:
+            result = await connection.execute(
+                favorites_select(user_id, kind, favorite, foreign_key, entity, embed))
+            return result.all()
+
+    results = await asyncio.gather(*[
+        lookup(kind, favorite, foreign_key, entity)
+        for kind, _, favorite, foreign_key, entity in FAVORITE_KINDS
+    ])
+    return favorites_payload(user_id, chain.from_iterable(results), embed)
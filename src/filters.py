@@ -0,0 +1,77 @@
+"""
+Query-string filters for the detail list endpoints: `column=value` for
+equality (repeat it to match any of several values) and `column__gte=`,
+`__lte=`, `__gt=`, `__lt=` for ranges. Only columns an index can serve are
+accepted, anything else would be a full table scan per request.
+"""
+from flask import request
+from sqlalchemy import Float, Integer, PrimaryKeyConstraint, UniqueConstraint
+from utils import APIException
+
+RESERVED_ARGS = ("limit", "after", "fields", "stream", "uids")
+RANGES = {
+    "gte": lambda column, value: column >= value,
+    "lte": lambda column, value: column <= value,
+    "gt": lambda column, value: column > value,
+    "lt": lambda column, value: column < value,
+}
+
+
+def index_columns(table):
+    keys = [list(index.columns.keys()) for index in table.indexes]
+    keys += [list(constraint.columns.keys()) for constraint in table.constraints
+             if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint))]
+    return keys
+
+
+def indexed(table, name, equalities):
+    # usable when the column leads an index, or follows leading columns
+    # that are all pinned by equality filters
+    for columns in index_columns(table):
+        if name in columns and all(
+                column in equalities for column in columns[:columns.index(name)]):
+            return True
+    return False
+
+
+def cast(column, arg, value):
+    try:
+        if isinstance(column.type, Integer):
+            return int(value)
+        if isinstance(column.type, Float):
+            return float(value)
+    except ValueError:
+        raise APIException(f"{arg} must be a number", status_code=400)
+    return value
+
+
+def parse_filters(model):
+    table = model.__table__
+    parsed = []
+    for arg, values in request.args.lists():
+        if arg in RESERVED_ARGS:
+            continue
+        name, _, operation = arg.partition("__")
+        if name not in table.columns or (operation and operation not in RANGES):
+            raise APIException(f"Unknown filter: {arg}", status_code=400)
+        column = table.columns[name]
+        if operation and not isinstance(column.type, (Integer, Float)):
+            raise APIException(
+                f"{name} only supports equality filters", status_code=400)
+        parsed.append((name, operation, column,
+                       [cast(column, arg, value) for value in values]))
+
+    equalities = {name for name, operation, *_ in parsed if not operation}
+    unindexed = sorted({name for name, *_ in parsed
+                        if not indexed(table, name, equalities)})
+    if unindexed:
+        raise APIException(
+            f"No index to filter on: {', '.join(unindexed)}", status_code=400)
+
+    filters = []
+    for _, operation, column, values in parsed:
+        if not operation:
+            filters.append(column == values[0] if len(values) == 1 else column.in_(values))
+        else:
+            filters += [RANGES[operation](column, value) for value in values]
+    return filters
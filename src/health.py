@@ -0,0 +1,62 @@
+"""
+GET /healthz and GET /readyz for the orchestrator's probes. /healthz only
+says the worker answers requests; /readyz pings every database engine, at
+most once per READY_CHECK_TTL seconds per worker, and reports the checkouts
+of their pools. Neither is counted in the request metrics.
+"""
+import threading
+import time
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from models import db
+from pool import pool_stats
+
+
+class Readiness:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.pings = {}
+        self.expires_at = 0
+
+    def ping(self, engine):
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except SQLAlchemyError as error:
+            return {"ok": False, "error": str(getattr(error, "orig", None) or error).splitlines()[0]}
+        return {"ok": True, "ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    def check(self, engines):
+        # one thread pings while the others answer from the last result, so a
+        # hanging database does not pile the probes up on the pool
+        if self.expires_at <= time.monotonic() and self.lock.acquire(blocking=not self.pings):
+            try:
+                self.pings = {name or "default": self.ping(engine)
+                              for name, engine in engines.items()}
+                self.expires_at = time.monotonic() + self.ttl
+            finally:
+                self.lock.release()
+        return self.pings
+
+
+def init_health(app):
+    app.extensions["readiness"] = Readiness(app.config["READY_CHECK_TTL"])
+
+
+def liveness():
+    return {"status": "ok"}
+
+
+def readiness():
+    pings = current_app.extensions["readiness"].check(db.engines)
+    ready = all(ping["ok"] for ping in pings.values())
+    return {
+        "status": "ready" if ready else "unavailable",
+        "databases": {
+            name: dict(ping, pool=pool_stats(db.engines[None if name == "default" else name]))
+            for name, ping in pings.items()
+        }
+    }, 200 if ready else 503
@@ -0,0 +1,169 @@
+"""
+Per-request SQL instrumentation: query count, DB time and slowest statements
+collected from engine events, reported as a Server-Timing header, as a
+structured log line for slow requests and as route-level histograms at
+/metrics (Prometheus text format, per worker process).
+"""
+import json
+import logging
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models import db
+from pool import render_pool_metrics
+from utils import DURATION_BUCKETS, Histogram
+
+logger = logging.getLogger("api.sql")
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SLOWEST_KEPT = 3
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    if not has_request_context() or "sql" not in g:
+        return
+    sql = g.sql
+    sql["count"] += 1
+    sql["time"] += elapsed
+    sql["slowest"].append((elapsed, statement))
+    sql["slowest"].sort(key=lambda item: item[0], reverse=True)
+    del sql["slowest"][SLOWEST_KEPT:]
+
+
+@event.listens_for(Engine, "handle_error")
+def discard_query_timer(context):
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(limit):
+    # checked under TESTING only: a view that issues more statements than
+    # this, hooks included, fails the request instead of slowly regressing
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.query_budget = limit
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def unmetered(view):
+    # probes and scrapes: kept out of the histograms and Server-Timing
+    view.unmetered = True
+    return view
+
+
+class RouteMetrics:
+    histograms = (
+        ("api_request_duration_seconds", "Request duration", DURATION_BUCKETS),
+        ("api_request_db_seconds", "Time spent in SQL per request", DURATION_BUCKETS),
+        ("api_request_queries", "SQL statements per request", QUERY_BUCKETS),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def observe(self, method, route, *values):
+        with self.lock:
+            histograms = self.routes.get((method, route))
+            if histograms is None:
+                histograms = self.routes[(method, route)] = [
+                    Histogram(buckets) for _, _, buckets in self.histograms]
+            for histogram, value in zip(histograms, values):
+                histogram.observe(value)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for index, (name, description, _) in enumerate(self.histograms):
+                lines += [f"# HELP {name} {description}",
+                          f"# TYPE {name} histogram"]
+                for (method, route), histograms in sorted(self.routes.items()):
+                    labels = f'method="{method}",route="{route}"'
+                    lines += histograms[index].render(name, labels)
+        return lines
+
+
+def init_instrumentation(app):
+    app.extensions["metrics"] = RouteMetrics()
+
+    @app.before_request
+    def start_request_timer():
+        if getattr(app.view_functions.get(request.endpoint), "unmetered", False):
+            return
+        g.request_start = time.perf_counter()
+        g.sql = {"count": 0, "time": 0.0, "slowest": []}
+
+    @app.after_request
+    def report_request(response):
+        if "sql" not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_start
+        sql = g.sql
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        app.extensions["metrics"].observe(
+            request.method, route, elapsed, sql["time"], sql["count"])
+
+        response.headers["Server-Timing"] = (
+            f'db;dur={sql["time"] * 1000:.2f};desc="{sql["count"]} queries", '
+            f"app;dur={elapsed * 1000:.2f}")
+
+        if app.testing and sql["count"] > g.get("query_budget", sql["count"]):
+            raise QueryBudgetExceeded(
+                f"{request.method} {request.full_path} issued {sql['count']} statements, "
+                f"its budget is {g.query_budget}: "
+                + " | ".join(statement for _, statement in sql["slowest"]))
+
+        threshold = current_app.config["SLOW_QUERY_MS"] / 1000
+        if sql["slowest"] and sql["slowest"][0][0] >= threshold:
+            logger.warning(json.dumps({
+                "event": "slow_query",
+                "method": request.method,
+                "route": route,
+                "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 2),
+                "db_ms": round(sql["time"] * 1000, 2),
+                "queries": sql["count"],
+                "slowest": [{"ms": round(duration * 1000, 2), "statement": statement[:300]}
+                            for duration, statement in sql["slowest"]]
+            }))
+        return response
+
+
+def render_metrics():
+    lines = current_app.extensions["metrics"].render()
+
+    unit_of_work = current_app.extensions["unit_of_work"]
+    lines += ["# HELP api_db_commits_total Commits issued by the unit of work",
+              "# TYPE api_db_commits_total counter",
+              f'api_db_commits_total {unit_of_work["commits"]}',
+              "# HELP api_db_rollbacks_total Rollbacks issued by the unit of work",
+              "# TYPE api_db_rollbacks_total counter",
+              f'api_db_rollbacks_total {unit_of_work["rollbacks"]}']
+
+    cache = current_app.extensions["cache"]
+    lines += ["# HELP api_cache_hits_total Response cache hits",
+              "# TYPE api_cache_hits_total counter",
+              f"api_cache_hits_total {cache.hits}",
+              "# HELP api_cache_misses_total Response cache misses",
+              "# TYPE api_cache_misses_total counter",
+              f"api_cache_misses_total {cache.misses}"]
+
+    lines += render_pool_metrics(db.engines)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,53 @@
+"""
+JSON providers for the app: orjson when it is installed (JSON_PROVIDER=orjson,
+the default) with the stdlib encoder as fallback. Both expose dumpb() so
+cached bodies go straight to bytes.
+"""
+import logging
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger("api.json")
+
+
+class JSONProvider(DefaultJSONProvider):
+    def dumpb(self, obj, **kwargs):
+        kwargs.setdefault("separators", (",", ":"))
+        return self.dumps(obj, **kwargs).encode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        body = self.dumpb(obj, indent=2) if pretty else self.dumpb(obj)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+class OrjsonProvider(JSONProvider):
+    def dumpb(self, obj, **kwargs):
+        # datetimes go through Flask's default so both providers emit HTTP dates
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self.dumpb(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def init_json(app):
+    if app.config["JSON_PROVIDER"] == "orjson" and orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        if app.config["JSON_PROVIDER"] == "orjson":
+            logger.warning("JSON_PROVIDER=orjson but orjson is not installed, "
+                           "using the stdlib encoder")
+        app.json = JSONProvider(app)
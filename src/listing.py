@@ -0,0 +1,113 @@
+"""
+Shared keyset (cursor) paginated listing and streaming export used by the
+collection endpoints
+"""
+from flask import Response, current_app, request, stream_with_context, url_for
+from sqlalchemy import select
+from models import db
+from utils import APIException
+
+
+def page_args():
+    try:
+        limit = int(request.args.get("limit", current_app.config["PAGE_SIZE"]))
+        after = request.args.get("after")
+        after = int(after) if after is not None else None
+    except ValueError:
+        raise APIException("limit and after must be integers", status_code=400)
+    if limit < 1:
+        raise APIException("limit must be greater than 0", status_code=400)
+
+    return min(limit, current_app.config["MAX_PAGE_SIZE"]), after
+
+
+def projected_columns(model, fields, allowed=None):
+    # always select the cursor column, the rest is whatever the client asked for
+    columns = model.__table__.columns
+    allowed = allowed or columns.keys()
+    if not fields:
+        return [columns[name] for name in allowed]
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise APIException(
+            f"Unknown fields: {', '.join(unknown)}", status_code=400)
+    if "id" not in names:
+        names.insert(0, "id")
+
+    return [columns[name] for name in names]
+
+
+def paginated_list(model, key, msg, empty_msg, allowed=None, filters=()):
+    limit, after = page_args()
+    fields = request.args.get("fields")
+    columns = projected_columns(model, fields, allowed)
+
+    # plain column rows, no ORM instances are built for a read-only page
+    query = select(*columns).where(*filters).order_by(model.id)
+    if after is not None:
+        query = query.where(model.id > after)
+    rows = db.session.execute(query.limit(limit + 1)).all()
+
+    if not rows and after is None:
+        return {"msg": empty_msg}
+
+    keys = [column.name for column in columns]
+    page = [dict(zip(keys, row)) for row in rows[:limit]]
+    next_cursor = page[-1]["id"] if len(rows) > limit else None
+    next_link = None
+    if next_cursor is not None:
+        # filters and the other query args carry over to the next page
+        args = request.args.to_dict(flat=False)
+        args.update(limit=limit, after=next_cursor)
+        next_link = url_for(request.endpoint, **request.view_args, **args)
+
+    return {
+        "msg": msg,
+        key: page,
+        "next_cursor": next_cursor,
+        "next": next_link
+    }
+
+
+def wants_stream():
+    if request.args.get("stream") in ("1", "true", "ndjson", "json"):
+        return True
+    best = request.accept_mimetypes.best_match(
+        ["application/json", "application/x-ndjson"])
+    return best == "application/x-ndjson"
+
+
+def streamed_list(model, key, allowed=None, filters=()):
+    # rows are fetched in server-side batches and written out as they arrive,
+    # so memory stays flat however large the table is
+    fields = request.args.get("fields")
+    columns = projected_columns(model, fields, allowed)
+    _, after = page_args()
+
+    query = select(*columns).where(*filters).order_by(model.id)
+    if after is not None:
+        query = query.where(model.id > after)
+    if "limit" in request.args:
+        query = query.limit(int(request.args["limit"]))
+    query = query.execution_options(
+        yield_per=current_app.config["STREAM_BATCH_SIZE"])
+    keys = [column.name for column in columns]
+    dumpb = current_app.json.dumpb
+
+    def generate_ndjson():
+        for row in db.session.execute(query):
+            yield dumpb(dict(zip(keys, row))) + b"\n"
+
+    def generate_json():
+        yield b'{"' + key.encode() + b'":['
+        separator = b""
+        for row in db.session.execute(query):
+            yield separator + dumpb(dict(zip(keys, row)))
+            separator = b","
+        yield b"]}"
+
+    if request.args.get("stream") == "json":
+        return Response(stream_with_context(generate_json()), mimetype="application/json")
+    return Response(stream_with_context(generate_ndjson()), mimetype="application/x-ndjson")
@@ -1,29 +1,90 @@
+from contextlib import contextmanager
+from flask import current_app, g
 from flask_sqlalchemy import SQLAlchemy
+from routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
+# <-- Unit of work -->
+# Every request is one unit of work: model add/update/delete only mark the
+# session dirty and the request commits at most once when it finishes.
+# Outside a request they commit straight away.
 
-class User(db.Model):
-    __tablename__ = "user"
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(15), index=True,
-                         unique=True, nullable=False)
-    email = db.Column(db.String(20), unique=True, nullable=False)
-    password = db.Column(db.String(10), nullable=False)
 
-    def __repr__(self):
-        return "<User %r>" % self.username
+def commit():
+    db.session.commit()
+    g.uow_commits = g.get("uow_commits", 0) + 1
+    current_app.extensions["unit_of_work"]["commits"] += 1
+
+
+def rollback():
+    db.session.rollback()
+    current_app.extensions["unit_of_work"]["rollbacks"] += 1
+
+
+def save():
+    if g.get("uow_open"):
+        g.uow_dirty = True
+    else:
+        commit()
+
+
+@contextmanager
+def savepoint():
+    # a failure inside only rolls back to the savepoint, the rest of the
+    # request's work stays pending
+    with db.session.begin_nested():
+        yield
 
+
+def init_unit_of_work(app):
+    app.extensions["unit_of_work"] = {"commits": 0, "rollbacks": 0}
+
+    @app.before_request
+    def begin_unit_of_work():
+        g.uow_open = True
+        g.uow_commits = 0
+
+    @app.after_request
+    def finish_unit_of_work(response):
+        g.uow_open = False
+        if g.pop("uow_dirty", False):
+            if response.status_code < 400:
+                commit()
+            else:
+                rollback()
+        response.headers["X-DB-Commits"] = str(g.get("uow_commits", 0))
+        return response
+
+    @app.teardown_request
+    def discard_unit_of_work(error):
+        if g.pop("uow_dirty", False):
+            rollback()
+
+
+class CRUDMixin:
     def add(self):
         db.session.add(self)
-        db.session.commit()
+        save()
 
     def update(self):
-        db.session.commit()
+        save()
 
     def delete(self):
         db.session.delete(self)
-        db.session.commit()
+        save()
+
+
+class User(CRUDMixin, db.Model):
+    __tablename__ = "user"
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(15), index=True,
+                         unique=True, nullable=False)
+    email = db.Column(db.String(20), unique=True, nullable=False)
+    password = db.Column(db.String(10), nullable=False)
+
+    def __repr__(self):
+        return "<User %r>" % self.username
 
     def get_characters_favorites(self):
         return list(map(lambda people: people.serialize(), self.people))
@@ -37,33 +98,26 @@ class User(db.Model):
     def serialize(self):
         return {
             "id": self.id,
-            "username": self.id,
+            "username": self.username,
             "email": self.email,
             # do not serialize the password, its a security breach
         }
 
 
-class Planets(db.Model):
+class Planets(CRUDMixin, db.Model):
     __tablename__ = "planets"
+    required_fields = ("uid", "name", "url")
     id = db.Column(db.Integer, primary_key=True)
     uid = db.Column(db.Integer, unique=True, nullable=False)
     name = db.Column(db.String(15), index=True, unique=True, nullable=False)
     url = db.Column(db.String(50), unique=True)
+    # read only, for ?expand: deleting the entity must not touch the details row
+    details = db.relationship(
+        "Planets_Details", uselist=False, viewonly=True)
 
     def __repr__(self):
         return "<Planets %r>" % self.name
 
-    def add(self):
-        db.session.add(self)
-        db.session.commit()
-
-    def update(self):
-        db.session.commit()
-
-    def delete(self):
-        db.session.delete(self)
-        db.session.commit()
-
     def serialize(self):
         return {
             "id": self.id,
@@ -73,8 +127,16 @@ class Planets(db.Model):
         }
 
 
-class Planets_Details(db.Model):
+class Planets_Details(CRUDMixin, db.Model):
     __tablename__ = "planets_details"
+    __table_args__ = (
+        # serve the list filters of GET /planets/details
+        db.Index("ix_planets_details_climate_terrain", "climate", "terrain"),
+        db.Index("ix_planets_details_terrain", "terrain"),
+        db.Index("ix_planets_details_gravity", "gravity"),
+    )
+    required_fields = ("uid", "population", "gravity", "rotation_period",
+                       "orbital_period", "climate", "terrain", "surface_water")
     id = db.Column(db.Integer, primary_key=True)
     uid = db.Column(db.Integer, db.ForeignKey(
         "planets.uid"), unique=True, nullable=False)
@@ -87,17 +149,7 @@ class Planets_Details(db.Model):
     surface_water = db.Column(db.String(15))
     planets = db.relationship(Planets)
 
-    def add(self):
-        db.session.add(self)
-        db.session.commit()
-
-    def update(self):
-        db.session.commit()
-
-    def delete(self):
-        db.session.delete(self)
-        db.session.commit()
-
+    def serialize(self):
         return {
             "id": self.id,
             "uid": self.uid,
@@ -111,7 +163,7 @@ class Planets_Details(db.Model):
         }
 
 
-class Favorite_Planets(db.Model):
+class Favorite_Planets(CRUDMixin, db.Model):
     __tablename__ = "favorite_planets"
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -119,14 +171,6 @@ class Favorite_Planets(db.Model):
     user = db.relationship(User)
     planets = db.relationship(Planets)
 
-    def add(self):
-        db.session.add(self)
-        db.session.commit()
-
-    def delete(self):
-        db.session.delete(self)
-        db.session.commit()
-
     def serialize(self):
         return {
             "id": self.id,
@@ -135,27 +179,20 @@ class Favorite_Planets(db.Model):
         }
 
 
-class Characters(db.Model):
+class Characters(CRUDMixin, db.Model):
     __tablename__ = "characters"
+    required_fields = ("uid", "name", "url")
     id = db.Column(db.Integer, primary_key=True)
     uid = db.Column(db.Integer, unique=True, nullable=False)
     name = db.Column(db.String(15), index=True, unique=True, nullable=False)
     url = db.Column(db.String(50), unique=True)
+    # read only, for ?expand: deleting the entity must not touch the details row
+    details = db.relationship(
+        "Characters_Details", uselist=False, viewonly=True)
 
     def __repr__(self):
         return "<Characters %r>" % self.name
 
-    def add(self):
-        db.session.add(self)
-        db.session.commit()
-
-    def update(self):
-        db.session.commit()
-
-    def delete(self):
-        db.session.delete(self)
-        db.session.commit()
-
     def serialize(self):
         return {
             "id": self.id,
@@ -165,8 +202,15 @@ class Characters(db.Model):
         }
 
 
-class Characters_Details(db.Model):
+class Characters_Details(CRUDMixin, db.Model):
     __tablename__ = "characters_details"
+    __table_args__ = (
+        # serve the list filters of GET /characters/details
+        db.Index("ix_characters_details_gender_mass", "gender", "mass"),
+        db.Index("ix_characters_details_mass", "mass"),
+    )
+    required_fields = ("uid", "height", "mass", "hair_color", "skin_color",
+                       "eye_color", "birth_year", "gender", "planetland")
     id = db.Column(db.Integer, primary_key=True)
     uid = db.Column(db.Integer, db.ForeignKey(
         "characters.uid"), unique=True, nullable=False)
@@ -179,19 +223,9 @@ class Characters_Details(db.Model):
     birth_year = db.Column(db.String(15))
     planetland = db.Column(db.Integer, db.ForeignKey("planets.uid"))
     characters = db.relationship(Characters)
-    planets = db.relationship(Planets)
-
-    def add(self):
-        db.session.add(self)
-        db.session.commit()
-
-    def update(self):
-        db.session.commit()
-
-    def delete(self):
-        db.session.delete(self)
-        db.session.commit()
+    planets = db.relationship(Planets, backref="characters_details")
 
+    def serialize(self):
         return {
             "id": self.id,
             "uid": self.uid,
@@ -206,7 +240,7 @@ class Characters_Details(db.Model):
         }
 
 
-class Favorite_Characters(db.Model):
+class Favorite_Characters(CRUDMixin, db.Model):
     __tablename__ = "favorite_characters"
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -214,14 +248,6 @@ class Favorite_Characters(db.Model):
     user = db.relationship(User)
     characters = db.relationship(Characters)
 
-    def add(self):
-        db.session.add(self)
-        db.session.commit()
-
-    def delete(self):
-        db.session.delete(self)
-        db.session.commit()
-
     def serialize(self):
         return {
             "id": self.id,
@@ -230,27 +256,20 @@ class Favorite_Characters(db.Model):
         }
 
 
-class Vehicles(db.Model):
+class Vehicles(CRUDMixin, db.Model):
     __tablename__ = "vehicles"
+    required_fields = ("uid", "name", "url")
     id = db.Column(db.Integer, primary_key=True, nullable=False)
     uid = db.Column(db.Integer, unique=True)
     name = db.Column(db.String(15), index=True, unique=True, nullable=False)
     url = db.Column(db.String(50), unique=True)
+    # read only, for ?expand: deleting the entity must not touch the details row
+    details = db.relationship(
+        "Vehicles_Details", uselist=False, viewonly=True)
 
     def __repr__(self):
         return "<Vehicles %r>" % self.name
 
-    def add(self):
-        db.session.add(self)
-        db.session.commit()
-
-    def update(self):
-        db.session.commit()
-
-    def delete(self):
-        db.session.delete(self)
-        db.session.commit()
-
     def serialize(self):
         return {
             "id": self.id,
@@ -260,8 +279,20 @@ class Vehicles(db.Model):
         }
 
 
-class Vehicles_Details(db.Model):
+class Vehicles_Details(CRUDMixin, db.Model):
     __tablename__ = "vehicles_details"
+    __table_args__ = (
+        # serve the list filters of GET /vehicles/details
+        db.Index("ix_vehicles_details_class_manufacturer",
+                 "vehicle_class", "manufacturer"),
+        db.Index("ix_vehicles_details_manufacturer", "manufacturer"),
+        db.Index("ix_vehicles_details_cost_in_credits", "cost_in_credits"),
+        db.Index("ix_vehicles_details_crew", "crew"),
+        db.Index("ix_vehicles_details_length", "length"),
+    )
+    required_fields = ("uid", "model", "vehicle_class", "manufacturer", "cost_in_credits",
+                       "length", "crew", "passengers", "max_atmosphering_speed",
+                       "cargo_capacity", "consumables")
     id = db.Column(db.Integer, primary_key=True)
     uid = db.Column(db.Integer, db.ForeignKey(
         "vehicles.uid"), unique=True, nullable=False)
@@ -277,17 +308,7 @@ class Vehicles_Details(db.Model):
     consumables = db.Column(db.String(15))
     vehicles = db.relationship(Vehicles)
 
-    def add(self):
-        db.session.add(self)
-        db.session.commit()
-
-    def update(self):
-        db.session.commit()
-
-    def delete(self):
-        db.session.delete(self)
-        db.session.commit()
-
+    def serialize(self):
         return {
             "id": self.id,
             "uid": self.uid,
@@ -304,7 +325,7 @@ class Vehicles_Details(db.Model):
         }
 
 
-class Favorite_Vehicles(db.Model):
+class Favorite_Vehicles(CRUDMixin, db.Model):
     __tablename__ = "favorite_vehicles"
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -312,17 +333,25 @@ class Favorite_Vehicles(db.Model):
     user = db.relationship(User)
     vehicles = db.relationship(Vehicles)
 
-    def add(self):
-        db.session.add(self)
-        db.session.commit()
-
-    def delete(self):
-        db.session.delete(self)
-        db.session.commit()
-
     def serialize(self):
         return {
             "id": self.id,
             "user_id": self.user_id,
             "vehicle_id": self.vehicle_id
         }
+
+
+class Table_Version(db.Model):
+    # bumped in the same transaction as every write to a table, read by the
+    # conditional GET handling to answer 304s without touching the data
+    __tablename__ = "table_version"
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def serialize(self):
+        return {
+            "table_name": self.table_name,
+            "version": self.version,
+            "updated_at": self.updated_at
+        }
@@ -0,0 +1,111 @@
+"""
+Connection pool settings for the SQLAlchemy engine, taken from environment
+variables, and a QueuePool that records how long checkouts wait.
+"""
+import os
+import threading
+import time
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+from models import db
+from routing import replica_keys
+from utils import DURATION_BUCKETS, Histogram
+
+
+class TimedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.waits = Histogram(DURATION_BUCKETS)
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            with self.lock:
+                self.timeouts += 1
+            raise
+        finally:
+            with self.lock:
+                self.waits.observe(time.perf_counter() - start)
+
+
+def engine_options(database_uri):
+    options = {
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    }
+    if database_uri.startswith("sqlite"):
+        # sqlite keeps its own pool class, sizes and timeouts do not apply
+        return options
+
+    options.update({
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+    })
+    if database_uri.startswith("postgresql"):
+        options["connect_args"] = {
+            "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", 10))}
+    return options
+
+
+def replica_binds(urls):
+    # replicas are plain binds; no model uses them directly, RoutingSession
+    # swaps them in for the primary on reads
+    return {key: dict(engine_options(url), url=url)
+            for key, url in zip(replica_keys(len(urls)), urls)}
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    if not isinstance(pool, TimedQueuePool):
+        return None
+    capacity = pool.size() + pool._max_overflow
+    return {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": pool.checkedout() / capacity if capacity > 0 else 0,
+        "timeouts": pool.timeouts
+    }
+
+
+def render_pool_metrics(engines):
+    gauges = (
+        ("api_db_pool_size", "Configured pool size", "size"),
+        ("api_db_pool_checked_out", "Connections checked out", "checked_out"),
+        ("api_db_pool_overflow", "Overflow connections open", "overflow"),
+        ("api_db_pool_saturation", "Checked out / (size + max_overflow)", "saturation"),
+        ("api_db_pool_timeouts_total", "Checkouts that timed out", "timeouts"),
+    )
+    pools = [(name or "default", engine.pool, pool_stats(engine))
+             for name, engine in engines.items()]
+    pools = [(name, pool, stats)
+             for name, pool, stats in pools if stats is not None]
+    lines = []
+    for metric, description, key in gauges:
+        kind = "counter" if metric.endswith("_total") else "gauge"
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{engine="{name}"}} {stats[key]}' for name,
+                  _, stats in pools]
+    lines += ["# HELP api_db_pool_checkout_seconds Time spent waiting for a pooled connection",
+              "# TYPE api_db_pool_checkout_seconds histogram"]
+    for name, pool, _ in pools:
+        with pool.lock:
+            lines += pool.waits.render("api_db_pool_checkout_seconds",
+                                       f'engine="{name}"')
+    return lines
+
+
+def dispose_engines(app):
+    # connections opened before a fork must not be shared with the children;
+    # close=False leaves the parent's sockets alone and drops them from the pool
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
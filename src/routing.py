@@ -0,0 +1,57 @@
+"""
+Read-replica routing: GET requests read from one of the DATABASE_REPLICA_URLS
+engines, picked round-robin per request; writes, and every statement after
+the first write of a session, go to the primary
+"""
+from contextlib import contextmanager
+from itertools import cycle
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+READ_METHODS = ("GET", "HEAD")
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.reads_from_replica(clause):
+            return self.replica()
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def reads_from_replica(self, clause):
+        # once the session wrote, later reads stay on the primary so the
+        # request sees its own writes whatever the replication lag is
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+        if self.info.get("wrote") or self.info.get("primary") or not has_request_context():
+            return False
+        return request.method in READ_METHODS and "replicas" in current_app.extensions
+
+    def replica(self):
+        # one replica per session, a request never mixes two snapshots
+        key = self.info.get("replica")
+        if key is None:
+            key = self.info["replica"] = next(current_app.extensions["replicas"])
+        return self._db.engines[key]
+
+
+@contextmanager
+def primary_reads(session):
+    # for reads that must not lag behind the primary, e.g. the ones filling
+    # the response cache under the generation the last commit bumped
+    previous = session.info.get("primary")
+    session.info["primary"] = True
+    try:
+        yield
+    finally:
+        session.info["primary"] = previous
+
+
+def replica_keys(count):
+    return [f"replica_{index}" for index in range(count)]
+
+
+def init_replicas(app):
+    keys = replica_keys(len(app.config["DATABASE_REPLICA_URLS"]))
+    if keys:
+        app.extensions["replicas"] = cycle(keys)
@@ -0,0 +1,209 @@
+"""
+Name search across characters, planets and vehicles for GET /search.
+
+One search_index table holds (kind, entity_id, uid, name, url) for every
+entity: an FTS5 table with prefix indexes on SQLite, a tsvector + trigram
+GIN indexed table on Postgres. It is created with the other tables,
+kept current from the session (ORM writes on flush, Core writes through
+reindex()) and built for an existing database with `flask search-reindex`.
+Other databases, or one without the index yet, fall back to prefix LIKE
+queries on the entity tables.
+"""
+import re
+from flask import request
+from sqlalchemy import Column, Integer, MetaData, String, Table, bindparam, event, func, inspect, literal, select, text, union_all
+from sqlalchemy.orm import Session
+from models import db, Characters, Planets, Vehicles
+from utils import APIException, chunks
+
+SEARCHABLE = {model.__tablename__: model for model in (Characters, Planets, Vehicles)}
+
+search_index = Table(
+    "search_index", MetaData(),
+    Column("kind", String(20)),
+    Column("entity_id", Integer),
+    Column("uid", Integer),
+    Column("name", String(50)),
+    Column("url", String(50)),
+)
+
+# kept out of db.metadata: the DDL is dialect specific and not a plain table
+INDEX_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "kind UNINDEXED, entity_id UNINDEXED, uid UNINDEXED, name, url UNINDEXED, "
+        "prefix='1 2 3', tokenize='unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE TABLE IF NOT EXISTS search_index ("
+        "kind VARCHAR(20) NOT NULL, entity_id INTEGER NOT NULL, uid INTEGER, "
+        "name VARCHAR(50) NOT NULL, url VARCHAR(50), "
+        "document TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', name)) STORED, "
+        "PRIMARY KEY (kind, entity_id))",
+        "CREATE INDEX IF NOT EXISTS ix_search_index_document "
+        "ON search_index USING gin (document)",
+        "CREATE INDEX IF NOT EXISTS ix_search_index_name_trgm "
+        "ON search_index USING gin (name gin_trgm_ops)",
+    ],
+}
+
+# ranking every match of a short prefix is what makes autocomplete slow, so
+# only the first CANDIDATES matches are ranked; on single column names a
+# shorter name is a closer match, which is what bm25 would say as well
+CANDIDATES = 1000
+SEARCH_SQL = {
+    "sqlite": text(
+        "SELECT kind, entity_id, uid, name, url, 1.0 / length(name) AS score FROM ("
+        "SELECT kind, entity_id, uid, name, url FROM search_index "
+        "WHERE search_index MATCH :match AND kind IN :kinds LIMIT :candidates) "
+        "ORDER BY length(name), name LIMIT :limit").bindparams(
+            bindparam("kinds", expanding=True)),
+    "postgresql": text(
+        "SELECT kind, entity_id, uid, name, url, "
+        "ts_rank(document, query) + similarity(name, :q) AS score FROM ("
+        "SELECT search_index.*, query FROM search_index, "
+        "to_tsquery('simple', :match) AS query "
+        "WHERE (document @@ query OR name % :q) AND kind IN :kinds "
+        "LIMIT :candidates) AS candidates "
+        "ORDER BY score DESC, name LIMIT :limit").bindparams(
+            bindparam("kinds", expanding=True)),
+}
+
+
+# engines known to have the index; a database that predates it keeps
+# working, without search maintenance, until it is created
+indexed_engines = set()
+
+
+def indexed(connection):
+    if connection.engine not in indexed_engines:
+        if (connection.dialect.name not in INDEX_DDL
+                or not inspect(connection).has_table("search_index")):
+            return False
+        indexed_engines.add(connection.engine)
+    return True
+
+
+def include_in_migrations(object, name, type_, reflected, compare_to):
+    # for Alembic: the index and the shadow tables of FTS5 are not in
+    # db.metadata, autogenerate would otherwise emit drops for them
+    return not (type_ == "table" and (name == "search_index" or name.startswith("search_index_")))
+
+
+@event.listens_for(db.metadata, "after_create")
+def create_search_index(target, connection, **kwargs):
+    for statement in INDEX_DDL.get(connection.dialect.name, ()):
+        connection.execute(text(statement))
+
+
+# <-- Index maintenance -->
+
+
+def reindex(connection, model, column, values):
+    # rows are replaced wholesale: whatever the entity table holds now for
+    # those keys, deleted entities simply leave nothing behind
+    if not indexed(connection) or not values:
+        return
+    kind = model.__tablename__
+    for chunk in chunks(sorted(values), 500):
+        ids = chunk if column is model.id else select(model.id).where(column.in_(chunk))
+        connection.execute(search_index.delete().where(
+            search_index.c.kind == kind, search_index.c.entity_id.in_(ids)))
+        connection.execute(search_index.insert().from_select(
+            ["kind", "entity_id", "uid", "name", "url"],
+            select(literal(kind), model.id, model.uid, model.name, model.url)
+            .where(column.in_(chunk))))
+
+
+@event.listens_for(Session, "after_flush")
+def reindex_flushed(session, flush_context):
+    changed = {}
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if instance.__tablename__ in SEARCHABLE:
+            changed.setdefault(instance.__tablename__, set()).add(instance.id)
+    for table, ids in changed.items():
+        model = SEARCHABLE[table]
+        reindex(session.connection(), model, model.id, ids)
+
+
+def rebuild(connection):
+    if not indexed(connection):
+        return
+    connection.execute(search_index.delete())
+    for kind, model in SEARCHABLE.items():
+        connection.execute(search_index.insert().from_select(
+            ["kind", "entity_id", "uid", "name", "url"],
+            select(literal(kind), model.id, model.uid, model.name, model.url)))
+
+
+def init_search(app):
+    @app.cli.command("search-reindex")
+    def search_reindex():
+        """Create and fill the search index from the entity tables."""
+        with db.engine.begin() as connection:
+            create_search_index(None, connection)
+            rebuild(connection)
+
+
+# <-- Queries -->
+
+
+def search_args():
+    q = request.args.get("q", "").strip()
+    terms = re.findall(r"\w+", q.lower())
+    if not terms:
+        raise APIException("q is required", status_code=400)
+    try:
+        limit = min(int(request.args.get("limit", 20)), 100)
+    except ValueError:
+        raise APIException("limit must be an integer", status_code=400)
+    kinds = request.args.get("types")
+    kinds = [kind.strip() for kind in kinds.split(",")] if kinds else list(SEARCHABLE)
+    unknown = [kind for kind in kinds if kind not in SEARCHABLE]
+    if unknown:
+        raise APIException(f"Unknown types: {', '.join(unknown)}", status_code=400)
+    return q, terms, max(limit, 1), kinds
+
+
+def prefix_search(q, limit, kinds):
+    # no search index: one prefix LIKE per table, served by the name index
+    pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    statement = union_all(*[
+        select(literal(kind).label("kind"), model.id.label("entity_id"), model.uid,
+               model.name, model.url, literal(1.0).label("score"))
+        .where(model.name.like(pattern, escape="\\"))
+        for kind, model in SEARCHABLE.items() if kind in kinds
+    ]).subquery()
+    return db.session.execute(
+        select(statement).order_by(func.length(statement.c.name), statement.c.name)
+        .limit(limit)).all()
+
+
+def search():
+    q, terms, limit, kinds = search_args()
+    connection = db.session.connection()
+    if indexed(connection):
+        dialect = connection.dialect.name
+        if dialect == "sqlite":
+            match = " ".join(f'"{term}"*' for term in terms)
+        else:
+            match = " & ".join(f"{term}:*" for term in terms)
+        rows = db.session.execute(SEARCH_SQL[dialect], {
+            "match": match, "q": q, "kinds": kinds, "limit": limit,
+            "candidates": CANDIDATES}).all()
+    else:
+        rows = prefix_search(q, limit, kinds)
+
+    return {
+        "msg": "ok",
+        "q": q,
+        "results": [{
+            "type": row.kind,
+            "id": row.entity_id,
+            "uid": row.uid,
+            "name": row.name,
+            "url": row.url,
+            "score": round(float(row.score), 4)
+        } for row in rows]
+    }
@@ -0,0 +1,79 @@
+"""
+GET / and GET /routes: the sitemap page and a machine-readable route catalog,
+built on first use and kept as ready-to-send (and pre-compressed) bytes with
+an ETag until the URL map changes
+"""
+import hashlib
+from flask import current_app, request
+from compression import compress, encode_response, negotiate
+from utils import generate_sitemap, sitemap_links
+
+MIMETYPES = {"html": "text/html", "json": "application/json"}
+CONVERTERS = {"IntegerConverter": "int", "FloatConverter": "float",
+              "PathConverter": "path", "UUIDConverter": "uuid"}
+
+
+def route_catalog(app):
+    routes = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: (rule.rule, rule.endpoint)):
+        # static files and the admin views are not part of the API
+        if not rule.endpoint.startswith("api."):
+            continue
+        routes.append({
+            "endpoint": rule.endpoint,
+            "path": rule.rule,
+            "methods": sorted(rule.methods - {"HEAD", "OPTIONS"}),
+            "parameters": [{"name": name, "type": CONVERTERS.get(type(converter).__name__, "string")}
+                           for name, converter in rule._converters.items()]
+        })
+    return routes
+
+
+def build_sitemap(app):
+    links = sitemap_links(app)
+    bodies = {
+        "html": generate_sitemap(app, links).encode(),
+        "json": app.json.dumpb({"links": links, "routes": route_catalog(app)})
+    }
+    return {
+        "bodies": bodies,
+        "etags": {kind: hashlib.blake2b(body, digest_size=12).hexdigest()
+                  for kind, body in bodies.items()},
+        "encoded": {}
+    }
+
+
+def get_sitemap():
+    # rules can only be added, so their count tells when the map changed;
+    # links depend on the mount point, hence the script root
+    app = current_app._get_current_object()
+    key = (sum(1 for _ in app.url_map.iter_rules()), request.script_root)
+    sitemap = app.extensions.get("sitemap")
+    if sitemap is None or sitemap["key"] != key:
+        sitemap = dict(build_sitemap(app), key=key)
+        app.extensions["sitemap"] = sitemap
+    return sitemap
+
+
+def sitemap_response(kind):
+    sitemap = get_sitemap()
+    body = sitemap["bodies"][kind]
+    response = current_app.response_class(body, mimetype=MIMETYPES[kind])
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate(len(body))
+    response.set_etag(sitemap["etags"][kind] + (f"-{encoding}" if encoding else ""))
+    response.make_conditional(request)
+    if response.status_code != 200 or encoding is None:
+        return response
+
+    encoded = sitemap["encoded"].get((kind, encoding))
+    if encoded is None:
+        encoded = sitemap["encoded"][(kind, encoding)] = compress(body, encoding)
+    return encode_response(response, encoding, encoded)
+
+
+def wants_json():
+    if request.args.get("format") == "json":
+        return True
+    best = request.accept_mimetypes.best_match(["text/html", "application/json"])
+    return best == "application/json"
@@ -0,0 +1,116 @@
+"""
+Worker boot timing: how long each module import and each init step of
+app.py takes. With STARTUP_REPORT=1 wsgi.py logs the report once the app is
+built; from a shell, a fresh interpreter prints it:
+
+    $ APP_MODE=api python src/startup.py
+"""
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("api.startup")
+
+IMPORTS_REPORTED = 20
+
+
+class TimedLoader:
+    # stands in for the module's loader while it executes, then puts the
+    # original back so nothing inspecting __loader__ later sees this one
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.timer.nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self.timer.nested.pop()
+            if self.timer.nested:
+                self.timer.nested[-1] += elapsed
+            self.timer.imports[module.__name__] = (elapsed, elapsed - children)
+            module.__loader__ = self.loader
+            if module.__spec__ is not None:
+                module.__spec__.loader = self.loader
+
+
+class ImportTimer:
+    # a meta path finder in front of the others, like `python -X importtime`
+    # but collected in process so the report can sit next to the init steps
+    def __init__(self):
+        self.imports = {}
+        self.nested = []
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self)
+        return spec
+
+
+import_timer = None
+
+
+def report_enabled():
+    # STARTUP_REPORT=1, true or yes
+    return os.getenv("STARTUP_REPORT", "").lower() in ("1", "true", "yes")
+
+
+def track_imports():
+    global import_timer
+    if import_timer is None:
+        import_timer = ImportTimer()
+        sys.meta_path.insert(0, import_timer)
+
+
+@contextmanager
+def step(app, init):
+    start = time.perf_counter()
+    yield
+    app.extensions.setdefault("startup", []).append(
+        (getattr(init, "__qualname__", str(init)), time.perf_counter() - start))
+
+
+def report(app, total=None):
+    steps = app.extensions.get("startup", [])
+    imports = import_timer.imports if import_timer is not None else {}
+    slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)
+    return {
+        "event": "startup",
+        "mode": app.config["APP_MODE"],
+        "pid": os.getpid(),
+        "total_ms": round(total * 1000, 1) if total is not None else None,
+        "steps": [{"step": name, "ms": round(elapsed * 1000, 2)} for name, elapsed in steps],
+        "imports": [{"module": name, "ms": round(cumulative * 1000, 2), "self_ms": round(own * 1000, 2)}
+                    for name, (cumulative, own) in slowest[:IMPORTS_REPORTED]],
+    }
+
+
+def log_report(app, total=None):
+    logger.warning(json.dumps(report(app, total)))
+
+
+if __name__ == "__main__":
+    track_imports()
+    start = time.perf_counter()
+    from wsgi import application
+    print(json.dumps(report(application, time.perf_counter() - start), indent=2))
@@ -1,7 +1,19 @@
 # This file was created to run the application on heroku using gunicorn.
 # Read more about it here: https://devcenter.heroku.com/articles/python-gunicorn
+import time
+import startup
 
-from app import app as application
+# STARTUP_REPORT=1 logs how long each import and init step took in this worker
+if startup.report_enabled():
+    startup.track_imports()
+started = time.perf_counter()
+
+from app import create_app  # noqa: E402
+
+application = create_app()
+
+if application.config["STARTUP_REPORT"]:
+    startup.log_report(application, time.perf_counter() - started)
 
 if __name__ == "__main__":
     application.run()
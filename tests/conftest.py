@@ -0,0 +1,61 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app import create_app  # noqa: E402
+from models import db, Characters, Characters_Details, Planets, Planets_Details, Vehicles, Vehicles_Details  # noqa: E402
+
+
+@pytest.fixture
+def settings(tmp_path):
+    # a fresh database file per test; override in a module to change the app
+    return {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "CACHE_BACKEND": "memory",
+        "APP_MODE": "api",
+        "TESTING": True,
+    }
+
+
+@pytest.fixture
+def app(settings):
+    app = create_app(settings)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def catalog(app):
+    # one of each entity, all with details, the character born on the planet
+    with app.app_context():
+        db.session.add_all([
+            Planets(uid=1, name="Tatooine", url="https://swapi.tech/api/planets/1"),
+            Characters(uid=1, name="Luke Skywalker", url="https://swapi.tech/api/people/1"),
+            Vehicles(uid=4, name="Sand Crawler", url="https://swapi.tech/api/vehicles/4"),
+        ])
+        db.session.flush()
+        db.session.add_all([
+            Planets_Details(uid=1, population="200000", gravity=1.0, rotation_period=23,
+                            orbital_period=304, climate="arid", terrain="desert",
+                            surface_water="1"),
+            Characters_Details(uid=1, height="172", mass=77, hair_color="blond",
+                               skin_color="fair", eye_color="blue", birth_year="19BBY",
+                               gender="male", planetland=1),
+            Vehicles_Details(uid=4, model="Digger", vehicle_class="wheeled",
+                             manufacturer="Corellia Mining",
+                             cost_in_credits=150000, length=36.8, crew=46, passengers=30,
+                             max_atmosphering_speed=30, cargo_capacity=50000,
+                             consumables="2 months"),
+        ])
+        db.session.commit()
@@ -0,0 +1,47 @@
+import pytest
+from admin import IndexedModelView
+from models import db, Characters
+
+@pytest.fixture
+def settings(settings):
+    return dict(settings, APP_MODE="all")
+
+
+VIEWS = ["user", "characters", "characters_details", "favorite_characters", "planets",
+         "planets_details", "favorite_planets", "vehicles", "vehicles_details", "favorite_vehicles"]
+
+
+@pytest.mark.parametrize("view", VIEWS)
+def test_list_pages_render(client, catalog, view):
+    assert client.get(f"/admin/{view}/").status_code == 200
+
+
+def test_search_matches_by_prefix(client, catalog):
+    assert b"Luke Skywalker" in client.get("/admin/characters/?search=Luke").data
+    assert b"Luke Skywalker" not in client.get("/admin/characters/?search=Sky").data
+
+
+def test_related_rows_load_through_ajax(client, catalog):
+    response = client.get("/admin/characters_details/edit/?id=1")
+    assert response.status_code == 200
+    assert b'data-url="/admin/characters_details/ajax/lookup/?name=planets"' in response.data
+
+    lookup = client.get("/admin/characters_details/ajax/lookup/?name=planets&query=Tat")
+    assert lookup.get_json() == [[1, "<Planets 'Tatooine'>"]]
+
+
+def test_sort_and_search_only_on_indexed_columns():
+    view = IndexedModelView(Characters, db.session, page_size=50, count_ttl=60, endpoint="characters_test")
+    assert set(view.column_sortable_list) == {"id", "uid", "name", "url"}
+    assert view.page_size_options == (20, 50, 100)
+
+
+def test_count_is_cached(app, catalog):
+    view = IndexedModelView(Characters, db.session, page_size=50, count_ttl=60, endpoint="characters_count")
+    with app.test_request_context("/admin/characters_count/"):
+        assert view.approximate_count() == 1
+        db.session.add(Characters(uid=2, name="Leia Organa", url="https://swapi.tech/api/people/2"))
+        db.session.commit()
+        assert view.approximate_count() == 1
+        view.cached_count = (None, 0)
+        assert view.approximate_count() == 2
@@ -0,0 +1,30 @@
+from app import create_app
+from models import db
+
+
+def test_sitemap_lists_the_endpoints(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert "/characters" in response.get_data(as_text=True)
+
+
+def test_get_character_list(client, catalog):
+    body = client.get("/characters").get_json()
+    assert [character["name"] for character in body["characters"]] == ["Luke Skywalker"]
+
+
+def test_apps_with_different_databases_coexist(tmp_path):
+    apps = [create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / name}.db", "APP_MODE": mode})
+            for name, mode in (("one", "api"), ("two", "all"))]
+    for app in apps:
+        with app.app_context():
+            db.create_all()
+    apps[0].test_client().post("/planets", json={"uid": 1, "name": "Hoth", "url": "https://swapi.tech/api/planets/1"})
+
+    assert apps[0].test_client().get("/planets").get_json()["planets"][0]["name"] == "Hoth"
+    assert apps[1].test_client().get("/planets").get_json() == {"msg": "No planets available"}
+    assert apps[0].test_client().get("/admin/").status_code == 404
+    assert apps[1].test_client().get("/admin/").status_code == 200
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import pytest
+from asgi import Application
+from models import db, Characters, User, Favorite_Characters, Favorite_Planets
+
+
+@pytest.fixture
+def favorites(app, catalog):
+    with app.app_context():
+        user = User(username="luke", email="luke@rebels.org", password="secret")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([Favorite_Characters(user_id=user.id, character_id=1),
+                            Favorite_Planets(user_id=user.id, planet_id=1)])
+        db.session.commit()
+
+
+def request(application, path, query=b"", method="GET", body=b"", headers=()):
+    scope = {"type": "http", "http_version": "1.1", "method": method, "scheme": "http",
+             "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query,
+             "headers": list(headers), "server": ("testserver", 80), "client": ("127.0.0.1", 5000)}
+    # the body arrives in two messages, like a client sending it in parts
+    parts = [body[:len(body) // 2], body[len(body) // 2:]]
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": parts.pop(0), "more_body": bool(parts)}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        try:
+            await application(scope, receive, send)
+        finally:
+            await application.shutdown()
+
+    asyncio.run(run())
+    return messages[0]["status"], b"".join(message.get("body", b"") for message in messages[1:]), messages
+
+
+def test_favorites_are_served_natively(app, client, favorites):
+    application = Application(app)
+    status, body, _ = request(application, "/user/favorites/1", b"expand=entity")
+    assert status == 200 and application.engines
+    assert json.loads(body) == client.get("/user/favorites/1?expand=entity").get_json()
+
+
+def test_other_routes_run_through_flask(app, catalog):
+    status, body, _ = request(Application(app), "/characters/details/1")
+    assert status == 200
+    assert json.loads(body)["characters_details"]["height"] == "172"
+
+
+def test_without_an_async_driver_everything_goes_through_flask(app, favorites, monkeypatch):
+    monkeypatch.setitem(app.config, "SQLALCHEMY_DATABASE_URI", "mysql://user@localhost/swapi")
+    application = Application(app)
+    status, body, _ = request(application, "/user/favorites/1")
+    assert status == 200 and application.engines == []
+    assert json.loads(body)["favorites"]["planets"][0]["planet_id"] == 1
+
+
+def test_request_body_reaches_flask(app):
+    body = json.dumps([{"uid": uid, "name": f"character {uid}", "url": f"https://swapi.tech/api/people/{uid}"}
+                       for uid in (1, 2)]).encode()
+    status, response, _ = request(Application(app), "/characters/bulk", method="POST", body=body,
+                                  headers=[(b"content-type", b"application/json"),
+                                           (b"content-length", str(len(body)).encode())])
+    assert status == 201 and json.loads(response)["inserted"] == 2
+
+
+def test_streamed_lists_stay_streamed(app, catalog, monkeypatch):
+    monkeypatch.setitem(app.config, "STREAM_BATCH_SIZE", 1)
+    with app.app_context():
+        db.session.add_all([Characters(uid=uid, name=f"character {uid}", url=f"https://swapi.tech/api/people/{uid}")
+                            for uid in (2, 3)])
+        db.session.commit()
+    status, body, messages = request(Application(app), "/characters", b"stream=1")
+    assert status == 200 and len(body.splitlines()) == 3
+    assert sum(1 for message in messages if message.get("more_body")) >= 3
@@ -0,0 +1,42 @@
+import pytest
+import batch
+from models import db, Planets, Planets_Details
+
+FIELDS = {"population": "1000", "gravity": 1.0, "rotation_period": 24, "orbital_period": 365,
+          "climate": "temperate", "terrain": "grasslands", "surface_water": "40"}
+
+
+@pytest.fixture
+def planets(app, catalog):
+    with app.app_context():
+        for uid in (2, 3):
+            db.session.add(Planets(uid=uid, name=f"planet {uid}", url=f"https://swapi.tech/api/planets/{uid}"))
+            db.session.add(Planets_Details(uid=uid, **FIELDS))
+        db.session.commit()
+
+
+def test_rows_follow_the_requested_order(client, planets):
+    body = client.get("/planets/details?uids=3,9,1,3").get_json()
+    assert [row["uid"] for row in body["planets_details"]] == [3, 1]
+    assert body["missing"] == [9]
+
+
+@pytest.mark.parametrize("payload", [{"uids": [2, 1]}, [2, 1]])
+def test_post_batch(client, planets, payload):
+    body = client.post("/planets/details/batch", json=payload).get_json()
+    assert [row["uid"] for row in body["planets_details"]] == [2, 1]
+    assert body["missing"] == []
+
+
+def test_lookups_are_chunked(client, planets, monkeypatch):
+    monkeypatch.setattr(batch, "CHUNK_SIZE", 1)
+    body = client.post("/planets/details/batch", json=[1, 2, 3]).get_json()
+    assert [row["uid"] for row in body["planets_details"]] == [1, 2, 3]
+
+
+def test_bad_batches(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_BATCH_UIDS", 2)
+    assert client.post("/planets/details/batch", json={"uids": []}).status_code == 400
+    assert client.get("/planets/details?uids=1,x").status_code == 400
+    response = client.post("/planets/details/batch", json=[1, 2, 3])
+    assert response.get_json()["message"] == "At most 2 uids per request"
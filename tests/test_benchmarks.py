@@ -0,0 +1,31 @@
+import importlib.util
+import os
+import models
+
+spec = importlib.util.spec_from_file_location(
+    "routes_benchmark", os.path.join(os.path.dirname(__file__), "..", "benchmarks", "routes.py"))
+routes_benchmark = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(routes_benchmark)
+
+
+def endpoints(app):
+    return {rule.endpoint for rule in app.url_map.iter_rules()
+            if rule.endpoint.startswith("api.")}
+
+
+def test_every_endpoint_has_a_scenario(app):
+    covered = {f"api.{endpoint}" for endpoint, _ in routes_benchmark.scenarios(10, 5)}
+    assert endpoints(app) - covered == set()
+    assert covered - endpoints(app) == set()
+
+
+def test_scenarios_run_against_the_seed(app):
+    counter = {"queries": 0}
+    with app.app_context():
+        routes_benchmark.seed(models.db, models, 10, 5, 2)
+        models.db.session.remove()
+    client = routes_benchmark.TestClient(app)
+    results = routes_benchmark.run(client, routes_benchmark.scenarios(10, 5), 2, counter)
+    failed = {endpoint: result["statuses"] for endpoint, result in results.items()
+              if set(result["statuses"]) - {"200", "201"}}
+    assert failed == {}
@@ -0,0 +1,86 @@
+import json
+from models import db, Characters
+
+
+def character(uid):
+    return {"uid": uid, "name": f"character {uid}", "url": f"https://swapi.tech/api/people/{uid}"}
+
+
+def test_bulk_insert_in_batches(app, client):
+    response = client.post("/characters/bulk?batch_size=2", json=[character(uid) for uid in range(1, 6)])
+    assert response.status_code == 201
+    assert response.get_json() == {"msg": "Completed", "inserted": 5, "errors": []}
+    with app.app_context():
+        assert db.session.query(Characters).count() == 5
+
+
+def test_bulk_insert_from_ndjson(client):
+    body = "\n".join(json.dumps(character(uid)) for uid in (1, 2)) + "\n"
+    response = client.post("/characters/bulk", data=body, content_type="application/x-ndjson")
+    assert response.get_json()["inserted"] == 2
+
+
+def test_invalid_items_are_reported_and_skipped(client, catalog):
+    response = client.post("/characters/bulk", json=[
+        character(2),
+        {"uid": 3},
+        {**character(4), "color": "red"},
+        {**character(5), "uid": 2},
+        {**character(6), "name": "Luke Skywalker"},
+    ])
+    body = response.get_json()
+    assert response.status_code == 201
+    assert body["msg"] == "Completed with errors" and body["inserted"] == 1
+    assert [error["index"] for error in body["errors"]] == [1, 2, 3, 4]
+    assert body["errors"][1]["error"] == "Unknown fields: color"
+
+
+def test_missing_foreign_key_is_an_item_error(client, catalog):
+    client.post("/characters/bulk", json=[character(2)])
+    response = client.post("/characters/details/bulk", json=[{
+        "uid": 2, "height": "172", "mass": 77, "hair_color": "blond", "skin_color": "fair",
+        "eye_color": "blue", "birth_year": "19BBY", "gender": "male", "planetland": 99}])
+    body = response.get_json()
+    assert response.status_code == 400
+    assert body["errors"][0]["error"].startswith("planetland 99")
+
+
+def test_bad_payloads(client):
+    assert client.post("/characters/bulk", json={"uid": 1}).status_code == 400
+    assert client.post("/characters/bulk?batch_size=0", json=[character(1)]).status_code == 400
+    assert client.post("/characters/bulk", data="{", content_type="application/x-ndjson").status_code == 400
+
+
+def test_upsert_inserts_updates_and_skips_unchanged(app, client, catalog):
+    response = client.put("/characters/bulk", json=[
+        {"uid": 1, "name": "Luke Skywalker", "url": "https://swapi.tech/api/people/1"},
+        {"uid": 2, "name": "Leia Organa", "url": "https://swapi.tech/api/people/2"},
+    ])
+    assert response.status_code == 200
+    assert response.get_json() == {"msg": "Completed", "inserted": 1, "updated": 0, "unchanged": 1, "errors": []}
+
+    response = client.put("/characters/bulk", json=[
+        {"uid": 2, "name": "Princess Leia", "url": "https://swapi.tech/api/people/2"}])
+    assert response.get_json()["updated"] == 1
+    assert client.get("/characters/2").get_json()["characters"]["name"] == "Princess Leia"
+    with app.app_context():
+        assert db.session.query(Characters).count() == 2
+
+
+def test_upsert_compares_numbers_by_column_type(client, catalog):
+    # 150000.0 for an integer column is the stored value, not a change
+    response = client.put("/vehicles/details/bulk", json=[{
+        "uid": 4, "model": "Digger", "vehicle_class": "wheeled", "manufacturer": "Corellia Mining",
+        "cost_in_credits": 150000.0, "length": 36.8, "crew": 46, "passengers": 30,
+        "max_atmosphering_speed": 30, "cargo_capacity": 50000, "consumables": "2 months"}])
+    assert response.get_json()["unchanged"] == 1
+
+
+def test_upsert_unique_clash_is_a_conflict(app, client, catalog):
+    client.post("/characters/bulk", json=[character(2)])
+    response = client.put("/characters/bulk", json=[character(3), {**character(2), "name": "Luke Skywalker"}])
+    assert response.status_code == 409
+    assert response.get_json()["message"] == "Bulk upsert failed, nothing was saved"
+    assert response.headers["X-DB-Commits"] == "0"
+    with app.app_context():
+        assert db.session.query(Characters).count() == 2
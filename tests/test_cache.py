@@ -0,0 +1,107 @@
+import threading
+import pytest
+from cache import LRUCache, SQLiteCache
+from models import Characters
+
+
+def test_detail_is_served_from_the_cache(client, catalog):
+    hits = client.get("/cache/stats").get_json()["hits"]
+    first = client.get("/characters/details/1")
+    second = client.get("/characters/details/1")
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert client.get("/cache/stats").get_json()["hits"] == hits + 1
+
+
+def test_update_invalidates_the_detail(client, catalog):
+    client.get("/characters/details/1")
+    assert client.put("/characters/details/1", json={"height": "180"}).status_code == 200
+    body = client.get("/characters/details/1").get_json()
+    assert body["characters_details"]["height"] == "180"
+
+
+def test_detail_read_racing_a_write_is_not_served_stale(client, catalog, monkeypatch):
+    serialize = Characters.serialize
+    racing = []
+
+    def rename():
+        racing.append(client.put("/characters/1", json={"name": "Red Five"}).status_code)
+
+    def commit_a_rename_first(character):
+        # the read has its (old) row, another request commits a write before
+        # the body is cached; a thread, so it gets its own context and session
+        if not racing:
+            writer = threading.Thread(target=rename)
+            writer.start()
+            writer.join()
+        return serialize(character)
+
+    monkeypatch.setattr(Characters, "serialize", commit_a_rename_first)
+    assert client.get("/characters/1").get_json()["characters"]["name"] == "Luke Skywalker"
+    monkeypatch.undo()
+    assert racing == [200]
+
+    assert client.get("/characters/1").get_json()["characters"]["name"] == "Red Five"
+
+
+def test_missing_detail_is_not_cached(app, client, catalog):
+    assert client.get("/characters/details/2").status_code == 404
+    cache = app.extensions["cache"]
+    assert cache._get(f"characters_details:2:{cache.generation('characters_details')}") is None
+
+
+def test_list_pages_follow_the_table_generation(client, catalog):
+    assert [planet["name"] for planet in client.get("/planets").get_json()["planets"]] == ["Tatooine"]
+    client.post("/planets", json={"uid": 2, "name": "Alderaan", "url": "https://swapi.tech/api/planets/2"})
+    assert len(client.get("/planets").get_json()["planets"]) == 2
+
+
+def test_least_recently_used_is_evicted():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_counters_are_thread_safe():
+    cache = LRUCache(max_entries=10, ttl=60)
+    cache.set("hit", b"body")
+
+    def lookups():
+        for _ in range(2000):
+            cache.get("hit")
+            cache.get("miss")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.hits, cache.misses) == (16000, 16000)
+
+
+def test_expired_entries_are_misses():
+    cache = LRUCache(max_entries=2, ttl=-1)
+    cache.set("a", b"1")
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+
+@pytest.fixture
+def shared(tmp_path):
+    path = str(tmp_path / "cache.db")
+    return SQLiteCache(100, 60, path), SQLiteCache(100, 60, path)
+
+
+def test_sqlite_backend_is_shared_between_workers(shared):
+    first, second = shared
+    first.set("planets:1", b"{}")
+    assert second.get("planets:1") == b"{}"
+    generation = first.generation("planets")
+    assert second.bump("planets") == generation + 1
+    second.delete("planets:1")
+    assert first.get("planets:1") is None
@@ -0,0 +1,50 @@
+import gzip
+import pytest
+
+
+@pytest.fixture
+def compress_all(app, monkeypatch):
+    monkeypatch.setitem(app.config, "COMPRESS_MIN_SIZE", 1)
+
+
+def test_gzip_when_accepted(client, catalog, compress_all):
+    plain = client.get("/characters/details/1")
+    response = client.get("/characters/details/1", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == plain.data
+    assert response.headers["ETag"] != plain.headers["ETag"]
+
+
+def test_compressed_copy_is_cached(app, client, catalog, compress_all):
+    first = client.get("/characters/details/1", headers={"Accept-Encoding": "gzip"})
+    cache = app.extensions["cache"]
+    assert cache._get(f"characters_details:1:{cache.generation('characters_details')}|gzip") == first.data
+    second = client.get("/characters/details/1", headers={"Accept-Encoding": "gzip"})
+    assert second.data == first.data
+
+
+def test_compressed_request_counts_one_lookup(app, client, catalog, compress_all):
+    cache = app.extensions["cache"]
+    for expected in ({"hits": 0, "misses": 1}, {"hits": 1, "misses": 1}):
+        client.get("/characters/details/1", headers={"Accept-Encoding": "gzip"})
+        assert {name: cache.stats()[name] for name in expected} == expected
+
+
+def test_small_bodies_are_sent_as_is(client, catalog):
+    response = client.get("/characters/details/1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_html_is_compressed_too(client, compress_all):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b"/characters" in gzip.decompress(response.data)
+
+
+def test_streams_and_errors_are_not_compressed(client, catalog, compress_all):
+    stream = client.get("/characters?stream=1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in stream.headers
+    missing = client.get("/characters/details/2", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in missing.headers
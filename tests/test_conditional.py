@@ -0,0 +1,32 @@
+def test_matching_etag_is_not_modified(client, catalog):
+    first = client.get("/characters/details/1")
+    assert first.status_code == 200 and first.headers["ETag"]
+
+    again = client.get("/characters/details/1", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_write_changes_the_etag(client, catalog):
+    etag = client.get("/characters/details/1").headers["ETag"]
+    client.put("/characters/details/1", json={"height": "180"})
+    response = client.get("/characters/details/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_if_modified_since(client, catalog):
+    first = client.get("/planets")
+    last_modified = first.headers["Last-Modified"]
+    assert client.get("/planets", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/planets", headers={"If-Modified-Since": "Sat, 01 Jan 2000 00:00:00 GMT"}).status_code == 200
+
+
+def test_etag_depends_on_the_query(client, catalog):
+    etag = client.get("/planets").headers["ETag"]
+    assert client.get("/planets?limit=1", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_errors_carry_no_etag(client, catalog):
+    response = client.get("/characters/details/2")
+    assert response.status_code == 404 and "ETag" not in response.headers
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/characters/1", "/planets/1", "/vehicles/4"])
+def test_delete_entity_with_details(client, catalog, path):
+    response = client.delete(path)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert client.get(path).status_code == 404
@@ -0,0 +1,50 @@
+import pytest
+from flask import jsonify
+from instrumentation import QueryBudgetExceeded, query_budget
+from models import db
+
+
+@pytest.mark.parametrize("path, expand", [
+    ("/characters/1", "details,planet"),
+    ("/planets/1", "details"),
+    ("/vehicles/4", "details"),
+])
+def test_expand_stays_within_query_budget(client, catalog, path, expand):
+    # TESTING is on, so a request over its @query_budget raises here
+    response = client.get(f"{path}?expand={expand}")
+    assert response.status_code == 200
+    body = response.get_json()
+    key = path.split("/")[1]
+    for name in expand.split(","):
+        assert body[key][name] is not None
+
+
+def test_expand_planet_embeds_homeworld_details(client, catalog):
+    body = client.get("/characters/1?expand=planet").get_json()
+    assert body["characters"]["planet"]["name"] == "Tatooine"
+    assert body["characters"]["planet"]["details"]["climate"] == "arid"
+
+
+def test_without_expand_the_entity_is_cached(app, client, catalog):
+    first = client.get("/vehicles/4").get_json()
+    assert first["vehicles"]["name"] == "Sand Crawler" and "details" not in first["vehicles"]
+    assert client.get("/vehicles/4").get_json() == first
+
+
+def test_unknown_expansion_and_entity(client, catalog):
+    assert client.get("/planets/1?expand=planet").status_code == 400
+    assert client.get("/planets/2").status_code == 404
+
+
+def test_query_budget_fails_the_request(app):
+    @query_budget(1)
+    def over_budget():
+        db.session.execute(db.select(1)).all()
+        db.session.execute(db.select(2)).all()
+        return jsonify({})
+
+    with app.test_request_context("/over-budget"):
+        app.preprocess_request()
+        response = over_budget()
+        with pytest.raises(QueryBudgetExceeded):
+            app.process_response(response)
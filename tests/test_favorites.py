@@ -0,0 +1,36 @@
+import pytest
+from models import db, User, Favorite_Characters, Favorite_Planets, Favorite_Vehicles
+
+
+@pytest.fixture
+def favorites(app, catalog):
+    with app.app_context():
+        user = User(username="luke", email="luke@rebels.org", password="secret")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([
+            Favorite_Characters(user_id=user.id, character_id=1),
+            Favorite_Planets(user_id=user.id, planet_id=1),
+            Favorite_Vehicles(user_id=user.id, vehicle_id=1),
+        ])
+        db.session.commit()
+        return user.id
+
+
+def test_favorites_of_every_kind(client, favorites):
+    body = client.get(f"/user/favorites/{favorites}").get_json()["favorites"]
+    assert body["characters"] == [{"id": 1, "user_id": favorites, "character_id": 1}]
+    assert body["planets"] == [{"id": 1, "user_id": favorites, "planet_id": 1}]
+    assert body["vehicles"] == [{"id": 1, "user_id": favorites, "vehicle_id": 1}]
+
+
+def test_favorites_embed_the_entity(client, favorites):
+    body = client.get(f"/user/favorites/{favorites}?expand=entity").get_json()["favorites"]
+    assert body["characters"][0]["character"]["name"] == "Luke Skywalker"
+    assert body["planets"][0]["planet"]["name"] == "Tatooine"
+    assert body["vehicles"][0]["vehicle"]["uid"] == 4
+
+
+def test_user_without_favorites(client, app):
+    body = client.get("/user/favorites/42").get_json()
+    assert body == {"favorites": {"characters": [], "planets": [], "vehicles": []}}
@@ -0,0 +1,46 @@
+import pytest
+from models import db, Characters, Characters_Details
+
+FIELDS = {"hair_color": "brown", "skin_color": "light", "eye_color": "brown", "birth_year": "19BBY"}
+
+
+@pytest.fixture
+def people(app, catalog):
+    with app.app_context():
+        for uid, gender, mass in ((2, "female", 49), (3, "male", 136), (4, "male", 75)):
+            db.session.add(Characters(uid=uid, name=f"character {uid}", url=f"https://swapi.tech/api/people/{uid}"))
+            db.session.add(Characters_Details(uid=uid, gender=gender, mass=mass, height="170", **FIELDS))
+        db.session.commit()
+
+
+def uids(response):
+    assert response.status_code == 200, response.get_json()
+    return [row["uid"] for row in response.get_json()["characters_details"]]
+
+
+def test_equality_and_any_of(client, people):
+    assert uids(client.get("/characters/details?gender=male")) == [1, 3, 4]
+    assert uids(client.get("/characters/details?gender=female&gender=male&limit=2")) == [1, 2]
+
+
+def test_range_after_a_pinned_column(client, people):
+    assert uids(client.get("/characters/details?gender=male&mass__gte=100")) == [3]
+    assert uids(client.get("/characters/details?mass__lt=77")) == [2, 4]
+
+
+def test_next_page_keeps_the_filters(client, people):
+    body = client.get("/characters/details?gender=male&limit=2").get_json()
+    assert "gender=male" in body["next"]
+    assert uids(client.get(body["next"])) == [4]
+
+
+@pytest.mark.parametrize("query, message", [
+    ("eye_color=blue", "No index to filter on: eye_color"),
+    ("gender__gte=a", "gender only supports equality filters"),
+    ("mass__gte=heavy", "mass__gte must be a number"),
+    ("weight=80", "Unknown filter: weight"),
+])
+def test_rejected_filters(client, people, query, message):
+    response = client.get(f"/characters/details?{query}")
+    assert response.status_code == 400
+    assert response.get_json()["message"] == message
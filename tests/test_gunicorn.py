@@ -0,0 +1,68 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import pytest
+
+pytest.importorskip("gunicorn")
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="gunicorn runs on POSIX only")
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+PROBE = """
+import gc
+import os
+from wsgi import application
+
+
+@application.route("/gc")
+def gc_state():
+    return {"enabled": gc.isenabled(), "pid": os.getpid()}
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def poll(url, until, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                state = json.loads(response.read())
+            if until(state):
+                return state
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise AssertionError(f"{url} did not answer in time")
+
+
+def test_workers_forked_after_a_reload_collect(tmp_path):
+    (tmp_path / "probe.py").write_text(PROBE)
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+         "--chdir", os.path.join(ROOT, "src"), "--pythonpath", str(tmp_path),
+         "-b", f"127.0.0.1:{port}", "-w", "1", "probe:application"],
+        env=dict(os.environ, APP_MODE="api", GUNICORN_PRELOAD="true",
+                 DATABASE_URL=f"sqlite:///{tmp_path / 'gunicorn.db'}"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f"http://127.0.0.1:{port}/gc"
+        first = poll(url, lambda state: True)
+        assert first["enabled"]
+
+        server.send_signal(signal.SIGHUP)
+        reloaded = poll(url, lambda state: state["pid"] != first["pid"])
+        assert reloaded["enabled"]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
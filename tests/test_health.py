@@ -0,0 +1,34 @@
+from sqlalchemy import create_engine
+from health import Readiness
+
+
+def test_healthz(client):
+    response = client.get("/healthz")
+    assert response.get_json() == {"status": "ok"}
+    assert "Server-Timing" not in response.headers
+
+
+def test_readyz_pings_the_database(client):
+    response = client.get("/readyz")
+    body = response.get_json()
+    assert response.status_code == 200 and body["status"] == "ready"
+    assert body["databases"]["default"]["ok"] is True
+    assert "Server-Timing" not in response.headers
+
+
+def test_probes_are_not_metered(client):
+    client.get("/healthz")
+    client.get("/readyz")
+    assert 'route="/readyz"' not in client.get("/metrics").get_data(as_text=True)
+
+
+def test_failed_ping_and_ttl(tmp_path):
+    engines = {None: create_engine(f"sqlite:///{tmp_path}/missing/test.db")}
+    readiness = Readiness(ttl=60)
+    first = readiness.check(engines)
+    assert first["default"]["ok"] is False and "unable to open" in first["default"]["error"]
+
+    (tmp_path / "missing").mkdir()
+    assert readiness.check(engines) is first
+    readiness.expires_at = 0
+    assert readiness.check(engines)["default"]["ok"] is True
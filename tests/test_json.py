@@ -0,0 +1,43 @@
+import logging
+from datetime import datetime
+import pytest
+from flask import Flask
+import json_provider
+from json_provider import JSONProvider, OrjsonProvider, init_json, orjson
+
+
+@pytest.fixture(params=["stdlib", "orjson"])
+def provider(request, app):
+    if request.param == "orjson":
+        if orjson is None:
+            pytest.skip("orjson is not installed")
+        return OrjsonProvider(app)
+    return JSONProvider(app)
+
+
+def test_providers_agree(provider):
+    obj = {"uid": 1, "name": "Luke Skywalker", "created": datetime(1977, 5, 25, 12, 0)}
+    assert provider.dumpb(obj) == b'{"created":"Wed, 25 May 1977 12:00:00 GMT","name":"Luke Skywalker","uid":1}'
+    assert provider.loads(provider.dumps(obj))["name"] == "Luke Skywalker"
+
+
+def test_responses_end_with_a_newline(provider, app):
+    with app.app_context():
+        response = provider.response({"msg": "ok"})
+    assert response.data == b'{"msg":"ok"}\n'
+    assert response.mimetype == "application/json"
+
+
+def test_list_rows_are_plain_dicts(client, catalog):
+    body = client.get("/characters").get_json()
+    assert body["characters"] == [{"id": 1, "uid": 1, "name": "Luke Skywalker", "url": "https://swapi.tech/api/people/1"}]
+
+
+def test_missing_orjson_is_logged(monkeypatch, caplog):
+    monkeypatch.setattr(json_provider, "orjson", None)
+    app = Flask(__name__)
+    app.config["JSON_PROVIDER"] = "orjson"
+    with caplog.at_level(logging.WARNING, logger="api.json"):
+        init_json(app)
+    assert type(app.json) is JSONProvider
+    assert "orjson is not installed" in caplog.text
@@ -0,0 +1,72 @@
+import json
+import pytest
+from models import db, Characters, User
+
+
+@pytest.fixture
+def characters(app):
+    with app.app_context():
+        db.session.add_all([Characters(uid=i, name=f"character {i}", url=f"https://swapi.tech/api/people/{i}")
+                            for i in range(1, 6)])
+        db.session.commit()
+
+
+def test_pages_follow_the_cursor(client, characters):
+    first = client.get("/characters?limit=2").get_json()
+    assert [character["uid"] for character in first["characters"]] == [1, 2]
+    assert first["next_cursor"] == 2
+
+    second = client.get(first["next"]).get_json()
+    assert [character["uid"] for character in second["characters"]] == [3, 4]
+
+    last = client.get(second["next"]).get_json()
+    assert [character["uid"] for character in last["characters"]] == [5]
+    assert last["next_cursor"] is None and last["next"] is None
+
+
+def test_fields_select_columns_and_keep_the_cursor(client, characters):
+    body = client.get("/characters?limit=1&fields=name").get_json()
+    assert body["characters"] == [{"id": 1, "name": "character 1"}]
+    assert "fields=name" in body["next"]
+
+
+def test_limit_is_capped(app, client, characters):
+    app.config["MAX_PAGE_SIZE"], max_page_size = 3, app.config["MAX_PAGE_SIZE"]
+    try:
+        assert len(client.get("/characters?limit=50").get_json()["characters"]) == 3
+    finally:
+        app.config["MAX_PAGE_SIZE"] = max_page_size
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=x", "after=x", "fields=password"])
+def test_bad_page_arguments(client, characters, query):
+    assert client.get(f"/characters?{query}").status_code == 400
+
+
+def test_empty_list(client):
+    assert client.get("/planets").get_json() == {"msg": "No planets available"}
+
+
+def test_stream_ndjson(client, characters):
+    response = client.get("/characters?stream=1&after=2")
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["uid"] for line in lines] == [3, 4, 5]
+
+
+def test_stream_ndjson_from_accept_header(client, characters):
+    response = client.get("/characters?fields=name", headers={"Accept": "application/x-ndjson"})
+    assert json.loads(response.get_data(as_text=True).splitlines()[0]) == {"id": 1, "name": "character 1"}
+
+
+def test_stream_json_array(client, characters):
+    body = json.loads(client.get("/characters?stream=json&limit=2").get_data(as_text=True))
+    assert [character["uid"] for character in body["characters"]] == [1, 2]
+
+
+def test_stream_users_leaves_out_passwords(app, client):
+    with app.app_context():
+        db.session.add(User(username="luke", email="luke@rebels.org", password="secret"))
+        db.session.commit()
+    user = json.loads(client.get("/user?stream=1").get_data(as_text=True))
+    assert user == {"id": 1, "username": "luke", "email": "luke@rebels.org"}
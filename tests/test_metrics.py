@@ -0,0 +1,37 @@
+import json
+import logging
+import re
+from utils import Histogram
+
+
+def test_server_timing_counts_the_queries(client, catalog):
+    header = client.get("/characters/details/1").headers["Server-Timing"]
+    match = re.match(r'db;dur=[\d.]+;desc="(\d+) queries", app;dur=[\d.]+$', header)
+    assert match and int(match.group(1)) >= 1
+
+
+def test_metrics_histograms_per_route(client, catalog):
+    client.get("/characters/details/1")
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'api_request_queries_count{method="GET",route="/characters/details/<int:character_uid>"}' in body
+    assert re.search(r"^api_db_commits_total \d+$", body, re.M)
+    assert re.search(r"^api_cache_hits_total \d+$", body, re.M)
+
+
+def test_slow_statements_are_logged(app, client, catalog, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="api.sql"):
+        client.get("/characters/details/1")
+    line = json.loads(caplog.records[-1].getMessage())
+    assert line["event"] == "slow_query" and line["status"] == 200
+    assert 1 <= len(line["slowest"]) <= min(3, line["queries"])
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 5, 10))
+    for value in (0, 3, 7, 20):
+        histogram.observe(value)
+    lines = histogram.render("queries", 'route="/"')
+    assert lines[:4] == ['queries_bucket{route="/",le="1"} 1', 'queries_bucket{route="/",le="5"} 2',
+                         'queries_bucket{route="/",le="10"} 3', 'queries_bucket{route="/",le="+Inf"} 4']
+    assert lines[-2:] == ['queries_sum{route="/"} 30', 'queries_count{route="/"} 4']
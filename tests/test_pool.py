@@ -0,0 +1,41 @@
+import sqlite3
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+from pool import TimedQueuePool, engine_options, pool_stats, render_pool_metrics
+
+
+def test_sqlite_keeps_its_own_pool():
+    options = engine_options("sqlite:////tmp/test.db")
+    assert "poolclass" not in options and options["pool_pre_ping"]
+
+
+def test_server_pool_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "1")
+    options = engine_options("postgresql://user@localhost/swapi")
+    assert options["poolclass"] is TimedQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (3, 1)
+    assert options["connect_args"] == {"connect_timeout": 10}
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=TimedQueuePool, pool_size=1, max_overflow=0,
+                           pool_timeout=0.01, creator=lambda: sqlite3.connect(":memory:", check_same_thread=False))
+    yield engine
+    engine.dispose()
+
+
+def test_checkouts_are_timed_and_timeouts_counted(engine):
+    connection = engine.connect()
+    with pytest.raises(TimeoutError):
+        engine.connect()
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 1 and stats["saturation"] == 1 and stats["timeouts"] == 1
+    assert engine.pool.waits.count == 2
+    connection.close()
+
+    lines = render_pool_metrics({None: engine})
+    assert 'api_db_pool_timeouts_total{engine="default"} 1' in lines
+    assert 'api_db_pool_checkout_seconds_count{engine="default"} 2' in lines
@@ -0,0 +1,92 @@
+import pytest
+from flask import Flask, jsonify, request
+from app import create_app
+from models import db, Characters
+from pool import replica_binds
+from routing import init_replicas
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    # a primary and two replica files, each holding a different character
+    urls = {name: f"sqlite:///{tmp_path / name}.db" for name in ("primary", "replica_0", "replica_1")}
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = urls["primary"]
+    app.config["DATABASE_REPLICA_URLS"] = [urls["replica_0"], urls["replica_1"]]
+    app.config["SQLALCHEMY_BINDS"] = replica_binds(app.config["DATABASE_REPLICA_URLS"])
+    db.init_app(app)
+    init_replicas(app)
+
+    @app.route("/names", methods=["GET", "POST"])
+    def names():
+        if request.method == "POST":
+            db.session.add(Characters(uid=9, name="written", url="https://swapi.tech/api/people/9"))
+            db.session.flush()
+        names = [character.name for character in db.session.query(Characters)]
+        db.session.commit()
+        return jsonify(names)
+
+    with app.app_context():
+        for key, name in ((None, "primary"), ("replica_0", "replica_0"), ("replica_1", "replica_1")):
+            engine = db.engines[key]
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(Characters.__table__.insert(), {"uid": 1, "name": name, "url": name})
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    # db is shared with the app under test, which has no replica binds
+    for key in app.config["SQLALCHEMY_BINDS"]:
+        db.metadatas.pop(key, None)
+
+
+def test_gets_alternate_between_replicas(replicated):
+    client = replicated.test_client()
+    names = {client.get("/names").get_json()[0] for _ in range(4)}
+    assert names == {"replica_0", "replica_1"}
+
+
+def test_writes_and_later_reads_use_the_primary(replicated):
+    client = replicated.test_client()
+    assert client.post("/names").get_json() == ["primary", "written"]
+    with replicated.app_context():
+        assert db.session.query(Characters).count() == 2
+
+
+def test_outside_a_request_reads_use_the_primary(replicated):
+    with replicated.app_context():
+        assert db.session.query(Characters.name).scalar() == "primary"
+
+
+@pytest.fixture
+def lagging(tmp_path):
+    # the full app on a primary and one replica that never catches up
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.db'}",
+        "DATABASE_REPLICA_URLS": [f"sqlite:///{tmp_path / 'replica.db'}"],
+        "CACHE_BACKEND": "memory",
+        "APP_MODE": "api",
+        "TESTING": True,
+    })
+    with app.app_context():
+        for engine in (db.engines[None], db.engines["replica_0"]):
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(Characters.__table__.insert(), {
+                    "uid": 1, "name": "Luke Skywalker", "url": "https://swapi.tech/api/people/1"})
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    for key in app.config["SQLALCHEMY_BINDS"]:
+        db.metadatas.pop(key, None)
+
+
+def test_cache_is_not_filled_from_a_lagging_replica(lagging):
+    client = lagging.test_client()
+    assert client.get("/characters/1").get_json()["characters"]["name"] == "Luke Skywalker"
+    assert client.put("/characters/1", json={"name": "Red Five"}).status_code == 200
+    # the replica still has the old row; the miss on the new generation must not cache it
+    for _ in range(2):
+        assert client.get("/characters/1").get_json()["characters"]["name"] == "Red Five"
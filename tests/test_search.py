@@ -0,0 +1,48 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+import search
+from models import db
+
+
+def results(response):
+    assert response.status_code == 200, response.get_json()
+    return [(result["type"], result["name"]) for result in response.get_json()["results"]]
+
+
+def test_search_finds_entities_by_prefix(client, catalog):
+    assert results(client.get("/search?q=tat")) == [("planets", "Tatooine")]
+    assert results(client.get("/search?q=luke sky")) == [("characters", "Luke Skywalker")]
+
+
+def test_types_narrow_the_search(client, catalog):
+    client.post("/characters", json={"uid": 2, "name": "Sandman", "url": "https://swapi.tech/api/people/2"})
+    assert results(client.get("/search?q=sand&types=vehicles")) == [("vehicles", "Sand Crawler")]
+    assert len(results(client.get("/search?q=sand"))) == 2
+
+
+def test_writes_are_reindexed(client, catalog):
+    client.put("/planets/1", json={"name": "Naboo"})
+    assert results(client.get("/search?q=tat")) == []
+    assert results(client.get("/search?q=nab")) == [("planets", "Naboo")]
+
+    client.post("/vehicles/bulk", json=[{"uid": 5, "name": "Snowspeeder", "url": "https://swapi.tech/api/vehicles/5"}])
+    assert results(client.get("/search?q=snow")) == [("vehicles", "Snowspeeder")]
+
+
+def test_prefix_like_without_an_index(client, catalog, monkeypatch):
+    monkeypatch.setattr(search, "indexed", lambda connection: False)
+    assert results(client.get("/search?q=Tat")) == [("planets", "Tatooine")]
+
+
+@pytest.mark.parametrize("query", ["", "q=%20", "q=tat&limit=x", "q=tat&types=ships"])
+def test_bad_arguments(client, query):
+    assert client.get(f"/search?{query}").status_code == 400
+
+
+def test_search_index_is_left_out_of_migrations(app):
+    with app.app_context(), db.engine.connect() as connection:
+        context = MigrationContext.configure(
+            connection, opts={"include_object": search.include_in_migrations})
+        diff = compare_metadata(context, db.metadata)
+    assert [change for change in diff if change[0] == "remove_table"] == []
@@ -0,0 +1,32 @@
+def test_sitemap_is_cached_with_an_etag(app, client):
+    first = client.get("/")
+    assert first.mimetype == "text/html" and first.headers["ETag"]
+    assert client.get("/", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert app.extensions["sitemap"]["bodies"]["html"] == first.data
+
+
+def test_sitemap_as_json(client):
+    by_format = client.get("/?format=json")
+    by_accept = client.get("/", headers={"Accept": "application/json"})
+    assert by_format.mimetype == by_accept.mimetype == "application/json"
+    assert by_format.data == by_accept.data
+    assert "/characters" in by_format.get_json()["links"]
+
+
+def test_route_catalog(client):
+    routes = {route["endpoint"]: route for route in client.get("/routes").get_json()["routes"]}
+    assert routes["api.get_characters_details"] == {
+        "endpoint": "api.get_characters_details",
+        "path": "/characters/details/<int:character_uid>",
+        "methods": ["GET"],
+        "parameters": [{"name": "character_uid", "type": "int"}]
+    }
+    assert all(endpoint.startswith("api.") for endpoint in routes)
+
+
+def test_compressed_sitemap(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, "COMPRESS_MIN_SIZE", 1)
+    plain = client.get("/")
+    compressed = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+import startup
+from app import create_app
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+def run(code, **env):
+    result = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True,
+                            env=dict(os.environ, **env), check=True)
+    return result.stdout
+
+
+def test_api_mode_leaves_admin_and_migrate_out():
+    output = run("import json, sys, app; application = app.create_app({'APP_MODE': 'api'}); print(json.dumps("
+                 "['flask_admin' in sys.modules, 'alembic' in sys.modules,"
+                 " any(rule.rule.startswith('/admin') for rule in application.url_map.iter_rules())]))")
+    assert json.loads(output) == [False, False, False]
+
+
+def test_startup_report_from_a_fresh_interpreter():
+    report = json.loads(run("import runpy; runpy.run_path('startup.py', run_name='__main__')", APP_MODE="api"))
+    assert report["mode"] == "api" and report["total_ms"] > 0
+    steps = [step["step"] for step in report["steps"]]
+    assert "init_admin" not in steps and "init_cache" in steps
+    assert report["imports"] and all(row["ms"] >= row["self_ms"] for row in report["imports"])
+
+
+def test_init_steps_are_timed(app):
+    steps = [name for name, _ in app.extensions["startup"]]
+    assert "init_cache" in steps and "init_admin" not in steps
+    assert startup.report(app)["mode"] == "api"
+
+
+@pytest.mark.parametrize("value, enabled", [("1", True), ("true", True), ("YES", True),
+                                            ("0", False), ("false", False), ("", False)])
+def test_startup_report_flag(settings, monkeypatch, value, enabled):
+    monkeypatch.setenv("STARTUP_REPORT", value)
+    assert startup.report_enabled() is enabled
+    assert create_app(settings).config["STARTUP_REPORT"] is enabled
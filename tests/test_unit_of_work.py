@@ -0,0 +1,61 @@
+import pytest
+from flask import Response
+from sqlalchemy.exc import IntegrityError
+from models import db, savepoint, Characters, Characters_Details, Planets
+
+
+def test_one_commit_per_request(app, client, catalog):
+    # deleting a planet also clears the planetland of its characters
+    with app.app_context():
+        db.session.add(Planets(uid=2, name="Alderaan", url="https://swapi.tech/api/planets/2"))
+        db.session.query(Characters_Details).one().planetland = 2
+        db.session.commit()
+
+    commits = app.extensions["unit_of_work"]["commits"]
+    response = client.delete("/planets/2")
+    assert response.status_code == 200
+    assert response.headers["X-DB-Commits"] == "1"
+    assert app.extensions["unit_of_work"]["commits"] == commits + 1
+    with app.app_context():
+        assert db.session.query(Planets).filter_by(uid=2).first() is None
+        assert db.session.query(Characters_Details).one().planetland is None
+
+
+def test_reads_do_not_commit(client, catalog):
+    assert client.get("/characters").headers["X-DB-Commits"] == "0"
+
+
+def test_error_response_rolls_back(app, catalog):
+    rollbacks = app.extensions["unit_of_work"]["rollbacks"]
+    with app.test_request_context("/characters/1", method="PUT"):
+        app.preprocess_request()
+        character = db.session.get(Characters, 1)
+        character.name = "Red Five"
+        character.update()
+        response = app.process_response(Response(status=400))
+    assert response.headers["X-DB-Commits"] == "0"
+    assert app.extensions["unit_of_work"]["rollbacks"] == rollbacks + 1
+    with app.app_context():
+        assert db.session.get(Characters, 1).name == "Luke Skywalker"
+
+
+def test_outside_a_request_writes_commit_at_once(app):
+    with app.app_context():
+        Characters(uid=2, name="Leia Organa", url="https://swapi.tech/api/people/2").add()
+        db.session.remove()
+        assert db.session.query(Characters).count() == 1
+
+
+def test_savepoint_rolls_back_only_its_own_work(app, catalog):
+    with app.test_request_context("/characters", method="POST"):
+        app.preprocess_request()
+        Characters(uid=2, name="Leia Organa", url="https://swapi.tech/api/people/2").add()
+        db.session.flush()
+        with pytest.raises(IntegrityError):
+            with savepoint():
+                db.session.execute(Characters.__table__.insert(), {
+                    "uid": 3, "name": "Luke Skywalker", "url": "https://swapi.tech/api/people/3"})
+        response = app.process_response(Response(status=201))
+    assert response.headers["X-DB-Commits"] == "1"
+    with app.app_context():
+        assert sorted(db.session.scalars(db.select(Characters.uid))) == [1, 2]